@@ -3,8 +3,19 @@
 """
 
 from fastapi import Depends, HTTPException, UploadFile, File
-from typing import List, Optional
-import uuid
+from typing import BinaryIO, List, Optional, Tuple
+from collections import OrderedDict
+from functools import lru_cache, partial
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import hashlib
+import itertools
+import logging
+import multiprocessing
+import os
+import secrets
+import threading
 from pathlib import Path
 import time
 
@@ -16,16 +27,206 @@ from .errors import (
     ProcessingError
 )
 
+logger = logging.getLogger("api")
 
-def get_denoiser() -> Denoiser:
-    """Зависимость для получения экземпляра Denoiser."""
+# Размер блока при потоковом сохранении загрузок (1 MiB)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Уникальные имена загрузок: PID и время старта процесса + счетчик
+_UPLOAD_PREFIX = f"u{os.getpid():x}_{int(time.time()):x}"
+_upload_counter = itertools.count()
+
+
+class ResultCache:
+    """
+    Потокобезопасный LRU-кеш результатов обработки.
+    
+    Ключ - хеш загруженного файла и параметры обработки, значение -
+    путь к обработанному файлу и сопутствующие данные ответа.
+    Запись считается устаревшей, если обработанный файл удален или
+    перезаписан (изменились mtime или размер).
+    """
+    
+    def __init__(self, maxsize: int = 512):
+        """
+        Args:
+            maxsize: Максимальное количество записей
+        """
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _file_stamp(file_path: Path) -> Optional[Tuple[int, int]]:
+        """Возвращает (mtime_ns, размер) файла или None, если файла нет."""
+        try:
+            stat_result = os.stat(file_path)
+        except OSError:
+            return None
+        return stat_result.st_mtime_ns, stat_result.st_size
+    
+    def get(self, key: tuple) -> Optional[dict]:
+        """
+        Возвращает запись кеша, если она есть и обработанный файл не изменился.
+        
+        Args:
+            key: Ключ кеша
+            
+        Returns:
+            Запись кеша или None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        
+        if self._file_stamp(entry["processed_path"]) != entry["file_stamp"]:
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        
+        return entry
+    
+    def put(self, key: tuple, processed_path: Path, **data):
+        """
+        Добавляет запись в кеш, вытесняя самую старую при переполнении.
+        
+        Args:
+            key: Ключ кеша
+            processed_path: Путь к обработанному файлу
+            **data: Дополнительные данные для ответа
+        """
+        entry = {
+            "processed_path": processed_path,
+            "file_stamp": self._file_stamp(processed_path),
+            **data
+        }
+        
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+# Кеш результатов /denoise по содержимому загрузки
+result_cache = ResultCache(maxsize=settings.RESULT_CACHE_SIZE)
+
+
+@lru_cache(maxsize=1)
+def _get_shared_denoiser() -> Denoiser:
+    """Создает единственный экземпляр Denoiser на процесс."""
     return Denoiser(verbose=False)
 
 
+def get_denoiser() -> Denoiser:
+    """
+    Зависимость для получения экземпляра Denoiser.
+    
+    Denoiser не хранит состояния между вызовами denoise(),
+    поэтому один экземпляр переиспользуется всеми запросами.
+    """
+    return _get_shared_denoiser()
+
+
+# Denoiser рабочего процесса (создается инициализатором пула)
+_worker_denoiser: Optional[Denoiser] = None
+
+
+def _init_worker():
+    """Создает Denoiser один раз при старте рабочего процесса."""
+    global _worker_denoiser
+    _worker_denoiser = Denoiser(verbose=False)
+
+
+def _call_worker_denoiser(method_name: str, *args, **kwargs):
+    """Вызывает метод Denoiser рабочего процесса."""
+    return getattr(_worker_denoiser, method_name)(*args, **kwargs)
+
+
+@lru_cache(maxsize=1)
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Возвращает постоянный пул процессов для обработки аудио.
+    
+    Пул создается при запуске приложения (start_process_pool), а после
+    сбоя - при следующем обращении; каждый процесс держит собственный
+    Denoiser. Если PROCESS_WORKERS <= 0, пул не используется.
+    """
+    if settings.PROCESS_WORKERS <= 0:
+        return None
+    
+    # Не fork: в процессе уже работают потоки (uvicorn, asyncio.to_thread,
+    # BLAS), и дочерний процесс может унаследовать захваченную блокировку.
+    # forkserver, а где его нет - spawn
+    start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    
+    return ProcessPoolExecutor(
+        max_workers=settings.PROCESS_WORKERS,
+        mp_context=multiprocessing.get_context(start_method),
+        initializer=_init_worker
+    )
+
+
+async def start_process_pool():
+    """
+    Создает пул процессов при запуске приложения.
+    
+    Первая задача запускает сервер forkserver и один рабочий процесс,
+    поэтому холодный старт не приходится на первый запрос.
+    """
+    pool = get_process_pool()
+    if pool is not None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(pool, os.getpid)
+
+
+def shutdown_process_pool():
+    """Останавливает пул процессов (следующее обращение создаст новый)."""
+    if get_process_pool.cache_info().currsize:
+        pool = get_process_pool()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        get_process_pool.cache_clear()
+
+
+async def run_denoiser(denoiser: Denoiser, method_name: str, *args, **kwargs):
+    """
+    Выполняет метод Denoiser вне event loop.
+    
+    В пул процессов передаются пути к файлам, а не массивы; если пул
+    отключен, метод переданного экземпляра вызывается в отдельном потоке.
+    
+    Args:
+        denoiser: Экземпляр Denoiser (используется без пула процессов)
+        method_name: Имя метода Denoiser ("denoise" или "denoise_batch")
+        *args: Позиционные аргументы метода
+        **kwargs: Именованные аргументы метода
+        
+    Returns:
+        Результат метода
+    """
+    pool = get_process_pool()
+    if pool is None:
+        return await asyncio.to_thread(getattr(denoiser, method_name), *args, **kwargs)
+    
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            pool,
+            partial(_call_worker_denoiser, method_name, *args, **kwargs)
+        )
+    except BrokenProcessPool:
+        # Рабочий процесс упал - пересоздаем пул при следующем запросе
+        shutdown_process_pool()
+        raise
+
+
 def validate_file_extension(filename: str) -> bool:
     """Проверяет расширение файла."""
-    ext = Path(filename).suffix.lower()
-    return ext in settings.ALLOWED_EXTENSIONS
+    dot = filename.rfind(".")
+    return dot >= 0 and filename[dot:].lower() in settings.ALLOWED_EXTENSIONS_SET
 
 
 def validate_file_size(file_size: int) -> bool:
@@ -34,22 +235,57 @@ def validate_file_size(file_size: int) -> bool:
     return file_size <= max_size
 
 
-async def validate_upload_file(
+def copy_with_limit(source: BinaryIO, file_path: Path, max_size_bytes: int) -> Tuple[int, str]:
+    """
+    Копирует файловый объект на диск блоками по UPLOAD_CHUNK_SIZE байт.
+    
+    Попутно считает хеш содержимого (BLAKE2b, 64 бита) для кеша результатов.
+    
+    Args:
+        source: Исходный файловый объект
+        file_path: Путь для сохранения
+        max_size_bytes: Лимит размера; при превышении копирование прерывается
+        
+    Returns:
+        Tuple[количество прочитанных байт (больше лимита, если копирование
+        прервано), hex-хеш содержимого]
+    """
+    total_size = 0
+    file_hash = hashlib.blake2b(digest_size=8)
+    with open(file_path, "wb") as buffer:
+        while chunk := source.read(UPLOAD_CHUNK_SIZE):
+            total_size += len(chunk)
+            if total_size > max_size_bytes:
+                break
+            file_hash.update(chunk)
+            buffer.write(chunk)
+    
+    return total_size, file_hash.hexdigest()
+
+
+async def stream_upload_to_disk(
     file: UploadFile,
+    upload_dir: Path = settings.UPLOAD_DIR,
     max_size_mb: Optional[int] = None
-) -> UploadFile:
+) -> Tuple[Path, str]:
     """
-    Валидация загружаемого файла.
+    Валидирует загружаемый файл и потоково сохраняет его на диск.
+    
+    Файл читается блоками по UPLOAD_CHUNK_SIZE байт и сразу пишется
+    в целевой файл, поэтому содержимое целиком в память не попадает.
+    Копирование идет в отдельном потоке и не блокирует event loop.
     
     Args:
         file: Загружаемый файл
+        upload_dir: Директория для сохранения
         max_size_mb: Максимальный размер в MB (если None - из настроек)
         
     Returns:
-        Валидированный файл
+        Tuple[путь к сохраненному файлу, хеш содержимого]
         
     Raises:
-        HTTPException: Если файл не проходит валидацию
+        UnsupportedFormatError: Если у файла неподдерживаемое расширение
+        FileTooLargeError: Если файл превышает максимальный размер
     """
     # Проверка имени файла
     if not file.filename:
@@ -65,48 +301,31 @@ async def validate_upload_file(
             settings.ALLOWED_EXTENSIONS
         )
     
-    # Проверка размера
     max_size = max_size_mb or settings.MAX_FILE_SIZE_MB
     max_size_bytes = max_size * 1024 * 1024
     
-    # Получаем размер файла
-    content = await file.read()
-    file_size = len(content)
-    
-    # Возвращаем курсор в начало
-    await file.seek(0)
-    
-    if file_size > max_size_bytes:
+    # Размер уже известен из multipart-парсера - отклоняем без чтения
+    if file.size is not None and file.size > max_size_bytes:
         raise FileTooLargeError(max_size)
     
-    return file
-
-
-async def save_upload_file(
-    file: UploadFile,
-    upload_dir: Path = settings.UPLOAD_DIR
-) -> Path:
-    """
-    Сохраняет загруженный файл на диск.
-    
-    Args:
-        file: Загруженный файл
-        upload_dir: Директория для сохранения
-        
-    Returns:
-        Путь к сохраненному файлу
-    """
     # Генерируем уникальное имя файла
     file_ext = Path(file.filename).suffix
-    unique_filename = f"{uuid.uuid4().hex}{file_ext}"
+    unique_filename = f"{_UPLOAD_PREFIX}_{next(_upload_counter):x}{file_ext}"
     file_path = upload_dir / unique_filename
     
-    # Сохраняем файл
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    # Копирование целиком выполняется в одном рабочем потоке
+    total_size, file_digest = await asyncio.to_thread(
+        copy_with_limit,
+        file.file,
+        file_path,
+        max_size_bytes
+    )
+    
+    if total_size > max_size_bytes:
+        file_path.unlink(missing_ok=True)
+        raise FileTooLargeError(max_size)
     
-    return file_path
+    return file_path, file_digest
 
 
 async def process_audio_file(
@@ -139,30 +358,95 @@ async def process_audio_file(
             kwargs["voice_type"] = voice_type
             
         
-        # Обработка
-        result = denoiser.denoise(
+        # Обработка (в пуле процессов, чтобы не блокировать event loop)
+        result = await run_denoiser(
+            denoiser,
+            "denoise",
             file_path,
             sr=sample_rate,
             method=method,
             **kwargs
         )
         
-        # Ресемплируем если нужно
-        if sample_rate and sample_rate != result["sample_rate"]:
-            from ..core import AudioIO
-            result["audio"] = AudioIO.resample_audio(
-                result["audio"],
-                result["sample_rate"],
-                sample_rate
-            )
-            result["sample_rate"] = sample_rate
-        
-        return result
+        # Файл загружен сразу с частотой sample_rate, ресемплинг - страховка
+        return await resample_result(result, sample_rate)
         
     except Exception as e:
         raise ProcessingError(f"Failed to process audio: {str(e)}")
 
 
+async def process_audio_batch(
+    file_paths: List[Path],
+    denoiser: Denoiser,
+    method: str = "adaptive",
+    sample_rate: Optional[int] = None
+) -> list:
+    """
+    Обрабатывает несколько аудиофайлов.
+    
+    Для методов из Denoiser.BATCHED_METHODS файлы обрабатываются одним
+    векторизованным вызовом denoise_batch, иначе - параллельно по одному.
+    
+    Args:
+        file_paths: Пути к аудиофайлам
+        denoiser: Экземпляр Denoiser
+        method: Метод очистки
+        sample_rate: Целевая частота дискретизации
+        
+    Returns:
+        Список результатов обработки или ProcessingError для каждого файла
+        (в том же порядке, что и file_paths)
+    """
+    if method in Denoiser.BATCHED_METHODS and len(file_paths) > 1:
+        try:
+            results = await run_denoiser(
+                denoiser,
+                "denoise_batch",
+                file_paths,
+                sr=sample_rate,
+                method=method
+            )
+            return [await resample_result(result, sample_rate) for result in results]
+        except Exception:
+            # Обрабатываем по одному, чтобы ошибка относилась к конкретному файлу
+            logger.warning(
+                "Пакетная обработка (%s) не удалась, обрабатываем файлы по одному",
+                method,
+                exc_info=True
+            )
+    
+    return await asyncio.gather(
+        *(
+            process_audio_file(file_path, denoiser, method, sample_rate)
+            for file_path in file_paths
+        ),
+        return_exceptions=True
+    )
+
+
+async def resample_result(result: dict, sample_rate: Optional[int] = None) -> dict:
+    """
+    Ресемплирует результат Denoiser, если частота отличается от целевой.
+    
+    Args:
+        result: Результаты обработки от Denoiser
+        sample_rate: Целевая частота дискретизации (если None - без изменений)
+        
+    Returns:
+        Результаты обработки с нужной частотой дискретизации
+    """
+    if sample_rate and sample_rate != result["sample_rate"]:
+        result["audio"] = await asyncio.to_thread(
+            AudioIO.resample_audio,
+            result["audio"],
+            result["sample_rate"],
+            sample_rate
+        )
+        result["sample_rate"] = sample_rate
+    
+    return result
+
+
 async def save_processed_audio(
     audio_data: dict,
     original_filename: str,
@@ -186,8 +470,8 @@ async def save_processed_audio(
     output_path = processed_dir / output_filename
     
     # Сохраняем
-    from ..core import AudioIO
-    AudioIO.save_audio(
+    await asyncio.to_thread(
+        AudioIO.save_audio,
         audio_data["audio"],
         output_path,
         audio_data["sample_rate"]
@@ -211,7 +495,7 @@ def get_audio_info(file_path: Path) -> dict:
 
 def generate_request_id() -> str:
     """Генерирует уникальный ID запроса."""
-    return f"req_{uuid.uuid4().hex[:8]}"
+    return f"req_{secrets.token_hex(4)}"
 
 
 def timing() -> float:
@@ -3,11 +3,20 @@
 """
 
 from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
 from typing import Any, Dict, Optional
-import uuid
+import orjson
+import secrets
 from .schemas import ErrorResponse
 
 
+class ORJSONResponse(JSONResponse):
+    """JSON-ответ, сериализуемый через orjson (быстрее стандартного json)."""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
 class APIError(HTTPException):
     """Базовый класс для ошибок API."""
     
@@ -24,7 +33,7 @@ class APIError(HTTPException):
             headers=headers
         )
         self.error = error
-        self.request_id = str(uuid.uuid4())[:8]
+        self.request_id = secrets.token_hex(4)
     
     def to_response(self) -> ErrorResponse:
         """Преобразует ошибку в Pydantic модель."""
@@ -99,7 +108,7 @@ def handle_api_error(exc: APIError) -> ErrorResponse:
 
 def handle_generic_error(exc: Exception) -> ErrorResponse:
     """Обработчик для общих ошибок."""
-    request_id = str(uuid.uuid4())[:8]
+    request_id = secrets.token_hex(4)
     return ErrorResponse(
         error="Internal server error",
         detail=str(exc),
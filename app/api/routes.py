@@ -2,9 +2,12 @@
 Маршруты (эндпоинты) API.
 """
 
-from fastapi import APIRouter, UploadFile, File, Form, Depends, BackgroundTasks, FastAPI, Request
-from fastapi.responses import FileResponse, JSONResponse
-from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, Form, Depends, BackgroundTasks, Request, Header
+from fastapi.responses import FileResponse
+from typing import List, Optional, Tuple
+from functools import lru_cache
+import asyncio
+import os
 import shutil
 from pathlib import Path
 import time
@@ -14,16 +17,16 @@ from ..core import Denoiser, AudioIO
 from . import schemas, errors
 from .dependencies import (
     get_denoiser,
-    validate_upload_file,
-    save_upload_file,
+    stream_upload_to_disk,
     process_audio_file,
+    process_audio_batch,
     save_processed_audio,
     get_audio_info,
     generate_request_id,
+    result_cache,
     timing
 )
 
-app = FastAPI()
 router = APIRouter(prefix=settings.API_PREFIX, tags=["audio"])
 
 # Глобальные переменные для состояния приложения
@@ -40,9 +43,15 @@ async def health_check():
     )
 
 
-@router.get("/methods")
-async def get_available_methods(denoiser: Denoiser = Depends(get_denoiser)):
-    """Возвращает список доступных методов очистки."""
+@lru_cache(maxsize=1)
+def get_methods_payload() -> dict:
+    """
+    Формирует ответ /methods.
+    
+    Список методов и их описания статичны, поэтому ответ
+    вычисляется один раз на процесс.
+    """
+    denoiser = get_denoiser()
     methods = denoiser.get_available_methods()
     descriptions = {
         method: denoiser.get_method_description(method)
@@ -56,6 +65,12 @@ async def get_available_methods(denoiser: Denoiser = Depends(get_denoiser)):
     }
 
 
+@router.get("/methods")
+async def get_available_methods():
+    """Возвращает список доступных методов очистки."""
+    return get_methods_payload()
+
+
 @router.post("/denoise", response_model=schemas.DenoiseResponse)
 async def denoise_audio(
     background_tasks: BackgroundTasks,
@@ -65,37 +80,59 @@ async def denoise_audio(
     voice_type: Optional[str] = Form("broadband"),
     denoiser: Denoiser = Depends(get_denoiser),
     request_id: str = Depends(generate_request_id),
-    start_time: float = Depends(timing)
+    start_time: float = Depends(timing),
+    accept: Optional[str] = Header(None)
 ):
     """
     Очищает аудиофайл от шума.
     
     Поддерживаемые форматы: WAV, MP3, OGG, FLAC, M4A, AAC
     Максимальный размер файла: 50MB
-    """
-    # Валидация файла
-    validated_file = await validate_upload_file(audio_file)
-    
-    # Сохраняем загруженный файл
-    upload_path = await save_upload_file(validated_file)
-    
-    # Получаем информацию об исходном файле
-    original_info = get_audio_info(upload_path)
-    
-    # Обрабатываем аудио
-    result = await process_audio_file(
-        upload_path,
-        denoiser,
-        method.value,
-        sample_rate,
-        voice_type
-    )
     
-    # Сохраняем обработанный файл
-    processed_path = await save_processed_audio(
-        result,
-        validated_file.filename
-    )
+    С заголовком Accept: application/octet-stream очищенный WAV
+    возвращается сразу в теле ответа, а сведения о результате -
+    в заголовках X-*, без отдельного запроса на /download.
+    """
+    # Валидируем и сохраняем загруженный файл
+    upload_path, upload_digest = await stream_upload_to_disk(audio_file)
+    
+    # Повторная загрузка того же файла с теми же параметрами берется из кеша
+    cache_key = (upload_digest, method.value, sample_rate, voice_type)
+    cached = result_cache.get(cache_key)
+    
+    if cached:
+        processed_path = cached["processed_path"]
+        original_info = cached["original_info"]
+        result_method = cached["method"]
+        result_sample_rate = cached["sample_rate"]
+    else:
+        # Получаем информацию об исходном файле
+        original_info = await asyncio.to_thread(get_audio_info, upload_path)
+        
+        # Обрабатываем аудио
+        result = await process_audio_file(
+            upload_path,
+            denoiser,
+            method.value,
+            sample_rate,
+            voice_type
+        )
+        
+        # Сохраняем обработанный файл
+        processed_path = await save_processed_audio(
+            result,
+            audio_file.filename
+        )
+        
+        result_method = result["method"]
+        result_sample_rate = result["sample_rate"]
+        result_cache.put(
+            cache_key,
+            processed_path,
+            original_info=original_info,
+            method=result_method,
+            sample_rate=result_sample_rate
+        )
     
     # Формируем URL для скачивания
     download_url = f"{settings.API_PREFIX}/download/{processed_path.name}"
@@ -106,15 +143,31 @@ async def denoise_audio(
     # Очищаем временные файлы (в фоновом режиме)
     background_tasks.add_task(cleanup_temp_file, upload_path)
     
-    # Формируем ответ
-    audio_info = schemas.AudioInfo(**original_info)
-    audio_info.sample_rate = result['sample_rate']
+    # Аудио прямо в ответе - клиенту не нужен второй запрос
+    if accept and "application/octet-stream" in accept:
+        return FileResponse(
+            path=processed_path,
+            filename=processed_path.name,
+            media_type="audio/wav",
+            headers={
+                "X-Request-ID": request_id,
+                "X-Method": result_method,
+                "X-Processing-Time": f"{processing_time:.6f}",
+                "X-Duration": str(original_info.get("duration", 0)),
+                "X-Sample-Rate": str(result_sample_rate)
+            }
+        )
+    
+    # Формируем ответ (данные получены внутри сервиса, валидация не нужна)
+    audio_info = schemas.AudioInfo.model_construct(
+        **{**original_info, "sample_rate": result_sample_rate}
+    )
     
     return schemas.DenoiseResponse(
         request_id=request_id,
         filename=processed_path.name,
         original_info=audio_info,
-        method=result["method"],
+        method=result_method,
         processing_time=processing_time,
         download_url=download_url
     )
@@ -144,50 +197,63 @@ async def denoise_batch(
             detail=f"Maximum {settings.MAX_UPLOAD_FILES} files allowed"
         )
     
-    results = []
-    download_urls = []
-    temp_files = []
+    # Валидируем и сохраняем загруженные файлы
+    uploads = await asyncio.gather(
+        *(stream_upload_to_disk(audio_file) for audio_file in audio_files),
+        return_exceptions=True
+    )
+    temp_files = [upload[0] for upload in uploads if not isinstance(upload, Exception)]
+    
+    # Обрабатываем все загруженные файлы одним пакетом
+    processed = await process_audio_batch(
+        temp_files,
+        denoiser,
+        method.value,
+        sample_rate
+    )
+    processed_by_path = dict(zip(temp_files, processed))
     
-    for audio_file in audio_files:
+    async def save_one(audio_file: UploadFile, upload) -> dict:
+        """Сохраняет результат обработки одного файла пакета."""
         try:
-            # Валидация файла
-            validated_file = await validate_upload_file(audio_file)
-            
-            # Сохраняем загруженный файл
-            upload_path = await save_upload_file(validated_file)
-            temp_files.append(upload_path)
+            if isinstance(upload, Exception):
+                raise upload
             
-            # Обрабатываем аудио
-            result = await process_audio_file(
-                upload_path,
-                denoiser,
-                method.value,
-                sample_rate
-            )
+            upload_path, _ = upload
+            result = processed_by_path[upload_path]
+            if isinstance(result, Exception):
+                raise result
             
             # Сохраняем обработанный файл
             processed_path = await save_processed_audio(
                 result,
-                validated_file.filename
+                audio_file.filename
             )
             
-            # Формируем URL для скачивания
-            download_url = f"{settings.API_PREFIX}/download/{processed_path.name}"
-            download_urls.append(download_url)
-            
-            results.append({
-                "filename": validated_file.filename,
+            return {
+                "filename": audio_file.filename,
                 "status": "success",
                 "processed_filename": processed_path.name,
                 "processing_time": result["processing_time"]
-            })
+            }
             
         except Exception as e:
-            results.append({
+            return {
                 "filename": audio_file.filename,
                 "status": "failed",
                 "error": str(e)
-            })
+            }
+    
+    # Порядок результатов совпадает с порядком файлов в запросе
+    results = await asyncio.gather(
+        *(save_one(audio_file, upload) for audio_file, upload in zip(audio_files, uploads))
+    )
+    
+    # Формируем URL для скачивания
+    download_urls = [
+        f"{settings.API_PREFIX}/download/{r['processed_filename']}"
+        for r in results if r["status"] == "success"
+    ]
     
     # Очищаем временные файлы (в фоновом режиме)
     for temp_file in temp_files:
@@ -217,8 +283,10 @@ async def download_file(filename: str):
     """
     file_path = settings.PROCESSED_DIR / filename
     
-    # Проверяем существование файла
-    if not file_path.exists():
+    # Проверяем существование файла (stat переиспользуется в FileResponse)
+    try:
+        stat_result = os.stat(file_path)
+    except OSError:
         raise errors.FileNotFoundError(filename)
     
     # Проверяем безопасность пути
@@ -234,7 +302,8 @@ async def download_file(filename: str):
     return FileResponse(
         path=file_path,
         filename=filename,
-        media_type="audio/wav"
+        media_type="audio/wav",
+        stat_result=stat_result
     )
 
 
@@ -253,7 +322,7 @@ async def get_file_info(filename: str):
         raise errors.FileNotFoundError(filename)
     
     # Получаем информацию
-    info = get_audio_info(file_path)
+    info = await asyncio.to_thread(get_audio_info, file_path)
     
     return info
 
@@ -266,21 +335,15 @@ async def cleanup_processed_files(days_old: int = 7):
     Args:
         days_old: Удалять файлы старше N дней (по умолчанию 7)
     """
-    import datetime
-    
-    deleted_files = []
-    current_time = datetime.datetime.now()
-    
-    for file_path in settings.PROCESSED_DIR.iterdir():
-        if file_path.is_file():
-            # Получаем время последнего изменения
-            mtime = datetime.datetime.fromtimestamp(file_path.stat().st_mtime)
-            age = current_time - mtime
-            
-            # Удаляем если старый
-            if age.days > days_old:
-                file_path.unlink()
-                deleted_files.append(file_path.name)
+    # Порог времени изменения: файлы старше него удаляются
+    cutoff = time.time() - days_old * 86_400
+    
+    # Обход и удаление выполняются вне event loop
+    deleted_files = await asyncio.to_thread(
+        delete_files_older_than,
+        settings.PROCESSED_DIR,
+        cutoff
+    )
     
     return {
         "status": "success",
@@ -291,6 +354,29 @@ async def cleanup_processed_files(days_old: int = 7):
 
 
 # Вспомогательные функции
+def delete_files_older_than(dir_path: Path, cutoff: float) -> List[str]:
+    """
+    Удаляет файлы директории, измененные раньше указанного момента.
+    
+    Args:
+        dir_path: Директория для очистки
+        cutoff: Временная метка (Unix time), старше которой файлы удаляются
+        
+    Returns:
+        Имена удаленных файлов
+    """
+    deleted_files = []
+    
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            # stat кеширован в DirEntry, повторный системный вызов не нужен
+            if entry.is_file(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                os.unlink(entry.path)
+                deleted_files.append(entry.name)
+    
+    return deleted_files
+
+
 async def cleanup_temp_file(file_path: Path):
     """
     Удаляет временный файл.
@@ -305,25 +391,46 @@ async def cleanup_temp_file(file_path: Path):
         pass  # Игнорируем ошибки при удалении
 
 
+def scan_dir(dir_path: Path) -> Tuple[int, int]:
+    """
+    Считает количество файлов и их суммарный размер (рекурсивно).
+    
+    Использует os.scandir: DirEntry кеширует тип и stat записи,
+    поэтому для каждого файла не создается Path и не делается лишний stat().
+    
+    Args:
+        dir_path: Директория для обхода
+        
+    Returns:
+        Tuple[количество файлов, размер в байтах]
+    """
+    file_count = 0
+    total_size = 0
+    stack = [dir_path]
+    
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    file_count += 1
+                    total_size += entry.stat(follow_symlinks=False).st_size
+    
+    return file_count, total_size
+
+
 @router.get("/stats")
 async def get_stats():
     """Получение статистики API."""
-    import os
-    
-    # Статистика по директориям
-    upload_count = len(list(settings.UPLOAD_DIR.iterdir()))
-    processed_count = len(list(settings.PROCESSED_DIR.iterdir()))
-    
-    # Размеры директорий
-    def get_dir_size(dir_path: Path) -> int:
-        total = 0
-        for file_path in dir_path.rglob("*"):
-            if file_path.is_file():
-                total += file_path.stat().st_size
-        return total
+    # Статистика по директориям (обходы идут параллельно вне event loop)
+    (upload_count, upload_size), (processed_count, processed_size) = await asyncio.gather(
+        asyncio.to_thread(scan_dir, settings.UPLOAD_DIR),
+        asyncio.to_thread(scan_dir, settings.PROCESSED_DIR)
+    )
     
-    upload_size_mb = get_dir_size(settings.UPLOAD_DIR) / (1024 * 1024)
-    processed_size_mb = get_dir_size(settings.PROCESSED_DIR) / (1024 * 1024)
+    upload_size_mb = upload_size / (1024 * 1024)
+    processed_size_mb = processed_size / (1024 * 1024)
     
     return {
         "uptime_seconds": time.time() - start_time,
@@ -336,21 +443,19 @@ async def get_stats():
     }
 
 
-# Регистрация обработчиков ошибок
-@app.exception_handler(errors.APIError)
+# Обработчики ошибок (регистрируются в app.main)
 async def api_error_handler(request, exc: errors.APIError):
     """Обработчик для APIError."""
-    return JSONResponse(
+    return errors.ORJSONResponse(
         status_code=exc.status_code,
-        content=exc.to_response().dict()
+        content=exc.to_response().model_dump()
     )
 
 
-@app.exception_handler(errors.APIError)
 async def generic_error_handler(request, exc: Exception):
     """Обработчик для общих ошибок."""
     error_response = errors.handle_generic_error(exc)
-    return JSONResponse(
+    return errors.ORJSONResponse(
         status_code=500,
-        content=error_response.dict()
+        content=error_response.model_dump()
     )
\ No newline at end of file
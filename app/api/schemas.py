@@ -2,7 +2,7 @@
 Pydantic схемы для API.
 """
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, Dict, Any, List, Union
 from enum import Enum
 from datetime import datetime
@@ -26,8 +26,8 @@ class AudioInfo(BaseModel):
     size_bytes: int = Field(..., description="Размер файла в байтах")
     format: str = Field(..., description="Формат файла")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "filename": "audio.wav",
                 "duration": 5.25,
@@ -37,6 +37,7 @@ class AudioInfo(BaseModel):
                 "format": "WAV"
             }
         }
+    )
 
 
 class DenoiseRequest(BaseModel):
@@ -56,20 +57,22 @@ class DenoiseRequest(BaseModel):
         description="Тип голоса для полосовой фильтрации (male/female/broadband)"
     )
     
-    @validator('voice_type')
+    @field_validator('voice_type')
+    @classmethod
     def validate_voice_type(cls, v):
         if v not in ['male', 'female', 'broadband']:
             raise ValueError('voice_type должен быть одним из: male, female, broadband')
         return v
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "method": "adaptive",
                 "sample_rate": 16000,
                 "voice_type": "broadband"
             }
         }
+    )
 
 
 class DenoiseResponse(BaseModel):
@@ -82,8 +85,8 @@ class DenoiseResponse(BaseModel):
     download_url: str = Field(..., description="URL для скачивания обработанного файла")
     timestamp: datetime = Field(default_factory=datetime.now)
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "request_id": "req_123456",
                 "filename": "cleaned_audio.wav",
@@ -101,6 +104,7 @@ class DenoiseResponse(BaseModel):
                 "timestamp": "2024-01-15T12:30:45.123456"
             }
         }
+    )
 
 
 class ErrorResponse(BaseModel):
@@ -109,14 +113,15 @@ class ErrorResponse(BaseModel):
     detail: Optional[str] = Field(None, description="Детали ошибки")
     request_id: Optional[str] = Field(None, description="ID запроса")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "error": "File not found",
                 "detail": "The requested audio file was not found",
                 "request_id": "req_123456"
             }
         }
+    )
 
 
 class HealthCheck(BaseModel):
@@ -126,8 +131,8 @@ class HealthCheck(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.now)
     uptime: float = Field(..., description="Время работы в секундах")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "status": "healthy",
                 "version": "1.0.0",
@@ -135,6 +140,7 @@ class HealthCheck(BaseModel):
                 "uptime": 3600.5
             }
         }
+    )
 
 
 class BatchProcessResponse(BaseModel):
@@ -3,8 +3,9 @@
 """
 
 import os
+from functools import cached_property
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, FrozenSet
 from pydantic_settings import BaseSettings
 from pydantic import Field
 from typing import List
@@ -32,6 +33,12 @@ class Settings(BaseSettings):
     DEFAULT_SAMPLE_RATE: int = 16000
     DEFAULT_METHOD: str = "noisereduce"
     
+    # Количество процессов для обработки аудио (0 - обработка в потоках)
+    PROCESS_WORKERS: int = int(os.getenv("PROCESS_WORKERS", str(os.cpu_count() or 1)))
+    
+    # Кеш результатов (количество записей)
+    RESULT_CACHE_SIZE: int = int(os.getenv("RESULT_CACHE_SIZE", "512"))
+    
     # Пути
     BASE_DIR: Path = Path(__file__).parent.parent
     UPLOAD_DIR: Path = BASE_DIR / "uploads"
@@ -45,8 +52,14 @@ class Settings(BaseSettings):
         case_sensitive = True
         extra = "allow"
     
+    @cached_property
+    def ALLOWED_EXTENSIONS_SET(self) -> FrozenSet[str]:
+        """Множество расширений в нижнем регистре для быстрой проверки."""
+        return frozenset(ext.lower() for ext in self.ALLOWED_EXTENSIONS)
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        
         # Создаем необходимые директории
         self.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
         self.PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
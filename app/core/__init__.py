@@ -3,7 +3,7 @@
 """
 
 from .audio_io import AudioIO, load_audio, save_audio, normalize_audio, get_audio_info
-from .stft_utils import STFTUtils, stft, istft, get_magnitude_phase, combine_magnitude_phase
+from .stft_utils import STFTUtils, stft, istft, get_magnitude_phase, combine_magnitude_phase, combine_from_original, enable_pyfftw_backend, get_torch_device
 from .denoiser import Denoiser, create_denoiser, denoise_file
 
 __version__ = "1.0.0"
@@ -24,6 +24,9 @@ __all__ = [
     'istft',
     'get_magnitude_phase',
     'combine_magnitude_phase',
+    'combine_from_original',
+    'enable_pyfftw_backend',
+    'get_torch_device',
     'create_denoiser',
     'denoise_file'
 ]
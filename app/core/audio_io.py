@@ -6,23 +6,136 @@ import librosa
 import soundfile as sf
 from pathlib import Path
 from typing import Union, Tuple, Optional
+from functools import lru_cache
 import io
+import shutil
+import subprocess
 import warnings
 warnings.filterwarnings('ignore')
 
 
+@lru_cache(maxsize=1)
+def _ffmpeg_path() -> Optional[str]:
+    """Путь к ffmpeg (ищется один раз) или None, если он не установлен."""
+    return shutil.which('ffmpeg')
+
+
 class AudioIO:
     """Класс для операций ввода-вывода с аудиофайлами."""
     
     # Поддерживаемые форматы
     SUPPORTED_FORMATS = {'.wav', '.mp3', '.ogg', '.flac', '.m4a', '.aac'}
     
+    # Форматы, которые читаются напрямую через soundfile (без librosa)
+    SOUNDFILE_FORMATS = {'.wav', '.flac', '.ogg'}
+    
+    # Алгоритм передискретизации по умолчанию (soxr среднего качества
+    # заметно быстрее soxr_hq и достаточен для речи)
+    DEFAULT_RES_TYPE = 'soxr_mq'
+    
+    @staticmethod
+    def _read_soundfile(
+        source,
+        sr: Optional[int],
+        mono: bool,
+        duration: Optional[float],
+        res_type: str = DEFAULT_RES_TYPE
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Читает аудио через soundfile и приводит к формату librosa.load.
+        
+        Args:
+            source: Путь к файлу или файловый объект
+            sr: Частота дискретизации (если None - исходная)
+            mono: Привести к моно
+            duration: Максимальная длительность в секундах
+            res_type: Алгоритм передискретизации
+            
+        Returns:
+            Tuple[audio_data, sample_rate]
+        """
+        with sf.SoundFile(source) as f:
+            sr_orig = f.samplerate
+            frames = int(duration * sr_orig) if duration else -1
+            audio = f.read(frames=frames, dtype='float32', always_2d=False)
+        
+        if audio.ndim == 2:
+            # soundfile возвращает [samples, channels], librosa - [channels, samples]
+            audio = audio.mean(axis=1) if mono else audio.T
+        
+        if sr is not None and sr != sr_orig:
+            audio = librosa.resample(audio, orig_sr=sr_orig, target_sr=sr, res_type=res_type)
+            return audio, sr
+        
+        return audio, sr_orig
+    
+    @staticmethod
+    def _load_via_ffmpeg(
+        source: Union[Path, bytes],
+        sr: int,
+        duration: Optional[float]
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Декодирует сжатый формат через ffmpeg в моно float32 с частотой sr.
+        
+        Args:
+            source: Путь к файлу или bytes
+            sr: Частота дискретизации результата
+            duration: Максимальная длительность в секундах
+            
+        Returns:
+            Tuple[audio_data, sample_rate]
+            
+        Raises:
+            ValueError: ffmpeg не смог декодировать файл
+        """
+        command = [_ffmpeg_path(), '-nostdin', '-v', 'error']
+        command += ['-i', 'pipe:0' if isinstance(source, bytes) else str(source)]
+        if duration:
+            command += ['-t', str(duration)]
+        command += ['-f', 'f32le', '-ac', '1', '-ar', str(sr), 'pipe:1']
+        
+        result = subprocess.run(
+            command,
+            input=source if isinstance(source, bytes) else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        if result.returncode != 0:
+            raise ValueError(f"ffmpeg не смог декодировать аудио: {result.stderr.decode(errors='ignore').strip()}")
+        
+        # frombuffer над bytes дает массив только для чтения - копируем
+        return np.frombuffer(result.stdout, dtype=np.float32).copy(), sr
+    
+    @staticmethod
+    def _load_compressed(
+        source: Union[Path, bytes],
+        sr: Optional[int],
+        mono: bool,
+        duration: Optional[float],
+        res_type: str
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Загружает сжатый формат (MP3/M4A/AAC и т.п.).
+        
+        Моно с заданной частотой декодируется напрямую через ffmpeg
+        (если он установлен), остальное - через librosa.
+        """
+        if sr is not None and mono and _ffmpeg_path():
+            return AudioIO._load_via_ffmpeg(source, sr, duration)
+        
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        
+        return librosa.load(source, sr=sr, mono=mono, duration=duration, res_type=res_type)
+    
     @staticmethod
     def load_audio(
         filepath: Union[str, Path, bytes],
         sr: Optional[int] = 16000,
         mono: bool = True,
-        duration: Optional[float] = None
+        duration: Optional[float] = None,
+        res_type: str = DEFAULT_RES_TYPE
     ) -> Tuple[np.ndarray, int]:
         """
         Загружает аудиофайл.
@@ -32,37 +145,52 @@ class AudioIO:
             sr: Частота дискретизации (если None - исходная)
             mono: Привести к моно
             duration: Максимальная длительность в секундах
+            res_type: Алгоритм передискретизации
             
         Returns:
             Tuple[audio_data, sample_rate]
             
         Raises:
-            FileNotFoundError: Файл не найден
             ValueError: Неподдерживаемый формат
+            sf.LibsndfileError: Файл не найден (WAV/FLAC/OGG)
+            FileNotFoundError: Файл не найден (сжатые форматы, через librosa)
+            ValueError: ffmpeg не смог декодировать сжатый формат
         """
-        try:
-            # Обработка bytes (например, из Telegram)
-            if isinstance(filepath, bytes):
-                audio, sr_orig = librosa.load(io.BytesIO(filepath), sr=sr, mono=mono, duration=duration)
-            else:
-                filepath = Path(filepath)
-                if not filepath.exists():
-                    raise FileNotFoundError(f"Файл {filepath} не найден")
-                
-                # Проверка формата
-                if filepath.suffix.lower() not in AudioIO.SUPPORTED_FORMATS:
-                    raise ValueError(f"Неподдерживаемый формат: {filepath.suffix}")
-                
-                audio, sr_orig = librosa.load(filepath, sr=sr, mono=mono, duration=duration)
-            
-            # Нормализация амплитуды
-            # audio = AudioIO.normalize_audio(audio)
+        # Обработка bytes (например, из Telegram)
+        if isinstance(filepath, bytes):
+            try:
+                audio, sr_orig = AudioIO._read_soundfile(
+                    io.BytesIO(filepath), sr, mono, duration, res_type
+                )
+            except sf.LibsndfileError:
+                # Сжатый формат, который soundfile не декодирует
+                audio, sr_orig = AudioIO._load_compressed(filepath, sr, mono, duration, res_type)
+        else:
+            # Существование файла не проверяем отдельно - ошибку
+            # открытия выбросит сам декодер
+            filepath = Path(filepath)
+            suffix = filepath.suffix.lower()
             
-            return audio, sr_orig if sr is None else sr
+            # Проверка формата
+            if suffix not in AudioIO.SUPPORTED_FORMATS:
+                raise ValueError(f"Неподдерживаемый формат: {filepath.suffix}")
             
-        except Exception as e:
-            print(e)
-            raise ValueError(f"Ошибка загрузки аудио: {e}")
+            if suffix in AudioIO.SOUNDFILE_FORMATS:
+                try:
+                    audio, sr_orig = AudioIO._read_soundfile(filepath, sr, mono, duration, res_type)
+                except sf.LibsndfileError:
+                    # Как и для bytes: неверное расширение или кодек, который
+                    # libsndfile не декодирует - пробуем ffmpeg/librosa
+                    if not filepath.exists():
+                        raise
+                    audio, sr_orig = AudioIO._load_compressed(filepath, sr, mono, duration, res_type)
+            else:
+                audio, sr_orig = AudioIO._load_compressed(filepath, sr, mono, duration, res_type)
+        
+        # Нормализация амплитуды
+        # audio = AudioIO.normalize_audio(audio)
+        
+        return audio, sr_orig if sr is None else sr
     
     @staticmethod
     def save_audio(
@@ -113,18 +241,24 @@ class AudioIO:
         if len(audio) == 0:
             return audio
         
-        # Текущий максимальный уровень
-        current_max = np.max(np.abs(audio))
+        # Текущий максимальный уровень (без временного массива np.abs)
+        current_max = max(float(audio.max()), -float(audio.min()))
         
         if current_max > 0:
             # Коэффициент нормализации
             norm_factor = target_level / current_max
             
+            # Сигнал уже нормализован (например, повторно перед сохранением)
+            if target_level <= 1.0 and abs(norm_factor - 1.0) < 1e-6:
+                return audio
+            
             # Применяем с ограничением
             audio_normalized = audio * norm_factor
             
             # Ограничиваем значения для избежания клиппинга
-            audio_normalized = np.clip(audio_normalized, -1.0, 1.0)
+            # (при target_level <= 1.0 выход за [-1, 1] невозможен)
+            if target_level > 1.0:
+                np.clip(audio_normalized, -1.0, 1.0, out=audio_normalized)
             
             # Используем мягкое ограничение для избежания резких искажений
             #threshold = 0.95
@@ -142,7 +276,12 @@ class AudioIO:
         return audio
     
     @staticmethod
-    def resample_audio(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    def resample_audio(
+        audio: np.ndarray,
+        orig_sr: int,
+        target_sr: int,
+        res_type: str = DEFAULT_RES_TYPE
+    ) -> np.ndarray:
         """
         Изменяет частоту дискретизации аудио.
         
@@ -150,6 +289,7 @@ class AudioIO:
             audio: Входной аудиосигнал
             orig_sr: Исходная частота дискретизации
             target_sr: Целевая частота дискретизации
+            res_type: Алгоритм передискретизации
             
         Returns:
             Передискретизированный сигнал
@@ -157,7 +297,7 @@ class AudioIO:
         if orig_sr == target_sr:
             return audio
         
-        return librosa.resample(audio, orig_sr=orig_sr, target_sr=target_sr)
+        return librosa.resample(audio, orig_sr=orig_sr, target_sr=target_sr, res_type=res_type)
     
     @staticmethod
     def get_audio_info(filepath: Union[str, Path]) -> dict:
@@ -172,28 +312,44 @@ class AudioIO:
         """
         filepath = Path(filepath)
         
-        # Используем soundfile для получения информации
-        signal, sample_rate = librosa.load(filepath, sr=None, mono=False)
-        # Основные характеристики
-        duration = round(len(signal) / sample_rate)
-        sr = sample_rate
-        if signal.ndim == 1:
-            channels = 1
-            total_samples = len(signal)
+        if filepath.suffix.lower() in AudioIO.SOUNDFILE_FORMATS:
+            # Метаданные без декодирования, статистики - потоково по блокам
+            info = sf.info(str(filepath))
+            sr = info.samplerate
+            channels = info.channels
+            total_samples = info.frames
+            
+            max_amplitude = 0.0
+            sum_abs = 0.0
+            sum_sq = 0.0
+            for block in sf.blocks(str(filepath), blocksize=65536, dtype='float32', always_2d=False):
+                mono = block.mean(axis=1, dtype=np.float32) if block.ndim > 1 else block
+                np.abs(mono, out=mono)
+                if mono.size:
+                    max_amplitude = max(max_amplitude, float(mono.max()))
+                sum_abs += float(mono.sum(dtype=np.float64))
+                sum_sq += float(np.dot(mono, mono))
         else:
-            channels = signal.shape[0]
-            total_samples = signal.shape[1]
-
+            # Сжатые форматы декодируются один раз
+            audio, sr = AudioIO.load_audio(filepath, sr=None, mono=False)
+            if audio.ndim == 1:
+                channels = 1
+                total_samples = len(audio)
+                audio_mono = audio
+            else:
+                channels = audio.shape[0]
+                total_samples = audio.shape[1]
+                audio_mono = AudioIO.convert_to_mono(audio)
+            
+            max_amplitude = float(np.max(np.abs(audio_mono))) if audio_mono.size else 0.0
+            sum_abs = float(np.sum(np.abs(audio_mono), dtype=np.float64))
+            sum_sq = float(np.dot(audio_mono, audio_mono))
+        
+        # Основные характеристики
+        duration = round(total_samples / sr)
         hop_length = 512
         frames = total_samples // hop_length + 1
-        
-        # Статистики (загружаем для расчета)
-        audio, _ = AudioIO.load_audio(filepath, sr=None, mono=False)
-        
-        if channels > 1:
-            audio_mono = np.mean(audio, axis=0) if audio.ndim > 1 else audio
-        else:
-            audio_mono = audio
+        n = max(total_samples, 1)
         
         return {
             'filepath': str(filepath),
@@ -203,9 +359,9 @@ class AudioIO:
             'channels': channels,
             'frames': frames,
             'format': filepath.suffix[1:],
-            'max_amplitude': float(np.max(np.abs(audio_mono))),
-            'mean_amplitude': float(np.mean(np.abs(audio_mono))),
-            'rms': float(np.sqrt(np.mean(audio_mono ** 2))),
+            'max_amplitude': max_amplitude,
+            'mean_amplitude': sum_abs / n,
+            'rms': float(np.sqrt(sum_sq / n)),
             'size_bytes': filepath.stat().st_size
         }
     
@@ -223,8 +379,19 @@ class AudioIO:
         if audio.ndim == 1:
             return audio
         
+        # Каналы - меньшая из двух осей
+        if audio.shape[0] > audio.shape[1]:
+            audio = audio.T
+        
+        if audio.shape[0] == 2:
+            # Стерео: (L + R) * 0.5 в заранее выделенный буфер
+            mono = np.empty(audio.shape[1], dtype=np.result_type(audio.dtype, np.float32))
+            np.add(audio[0], audio[1], out=mono)
+            mono *= 0.5
+            return mono
+        
         # Если это многоканальный звук, усредняем
-        return np.mean(audio, axis=0) if audio.shape[0] > audio.shape[1] else np.mean(audio, axis=1)
+        return np.mean(audio, axis=0)
     
     @staticmethod
     def trim_silence(
@@ -247,13 +414,46 @@ class AudioIO:
         Returns:
             Обрезанный аудиосигнал
         """
-        # Используем librosa для обрезки тишины
-        audio_trimmed, _ = librosa.effects.trim(
-            audio,
-            top_db=top_db,
-            frame_length=frame_length,
-            hop_length=hop_length
-        )
+        if audio.size == 0:
+            return audio
+        
+        if audio.ndim != 1 or frame_length % hop_length:
+            # Общий случай - через librosa
+            audio_trimmed, _ = librosa.effects.trim(
+                audio,
+                top_db=top_db,
+                frame_length=frame_length,
+                hop_length=hop_length
+            )
+            return audio_trimmed
+        
+        # Энергия кадров без STFT: сигнал (с центрированием, как в librosa)
+        # делится на блоки по hop_length, кадр - сумма соседних блоков
+        n_frames = 1 + len(audio) // hop_length
+        total = (n_frames - 1) * hop_length + frame_length
+        pad = frame_length // 2
+        padded = np.zeros(total, dtype=audio.dtype)
+        n_copy = min(len(audio), total - pad)
+        padded[pad:pad + n_copy] = audio[:n_copy]
+        
+        blocks = padded.reshape(-1, hop_length)
+        block_energy = np.einsum('ij,ij->i', blocks, blocks, dtype=np.float64)
+        cumulative = np.concatenate(([0.0], np.cumsum(block_energy)))
+        blocks_per_frame = frame_length // hop_length
+        frame_power = (
+            cumulative[blocks_per_frame:blocks_per_frame + n_frames] - cumulative[:n_frames]
+        ) / frame_length
+        
+        # Кадры громче (максимум - top_db) считаются не тишиной
+        threshold = max(frame_power.max(), 1e-10) * 10.0 ** (-top_db / 10.0)
+        non_silent = np.flatnonzero(np.maximum(frame_power, 1e-10) > threshold)
+        
+        if non_silent.size == 0:
+            return audio[:0]
+        
+        start = non_silent[0] * hop_length
+        end = min(len(audio), (non_silent[-1] + 1) * hop_length)
+        audio_trimmed = audio[start:end]
         
         return audio_trimmed
 
@@ -4,13 +4,28 @@
 """
 import numpy as np
 import librosa
+import scipy.fft
 from scipy import signal
-from typing import Union, Optional, Dict, Any
+from typing import Union, Optional, Dict, Any, List, Tuple
 import noisereduce as nr
 from pathlib import Path
+from functools import lru_cache
+import threading
 
 from .audio_io import AudioIO
-from .stft_utils import STFTUtils
+from .stft_utils import STFTUtils, get_torch_device
+
+
+@lru_cache(maxsize=64)
+def _butter_sos(order: int, low: float, high: float) -> np.ndarray:
+    """Полосовой фильтр Баттерворта в виде каскада биквадов (кешируется)."""
+    return signal.butter(order, [low, high], btype='band', output='sos')
+
+
+@lru_cache(maxsize=64)
+def _notch_sos(w0: float, Q: float) -> np.ndarray:
+    """Notch фильтр в виде каскада биквадов (кешируется)."""
+    return signal.tf2sos(*signal.iirnotch(w0, Q))
 
 
 class Denoiser:
@@ -26,6 +41,14 @@ class Denoiser:
     METHOD_NOISEREDUCE = "noisereduce"
     METHOD_ADAPTIVE = "adaptive"  # Адаптивный (комбинированный)
     
+    # Методы с векторизованной пакетной обработкой (denoise_batch)
+    BATCHED_METHODS = (METHOD_SPECTRAL_SUBTRACTION, METHOD_WIENER)
+    
+    # Предел размера рабочего буфера, который держится между вызовами
+    # (элементов; 4M float32 = 16 МБ). Большие массивы выделяются на вызов,
+    # чтобы длинный файл не закреплял память в каждом потоке пула
+    SCRATCH_MAX_ELEMENTS = 4 * 1024 * 1024
+    
     # Диапазоны частот для полосовой фильтрации (Гц)
     SPEECH_FREQ_RANGES = {
         'male': (80, 3000),      # Мужской голос
@@ -51,6 +74,9 @@ class Denoiser:
         self.target_sr = target_sr
         self.verbose = verbose
         
+        # Рабочие буферы спектральных методов (свои для каждого потока)
+        self._scratch = threading.local()
+        
         # Параметры методов
         self.method_params = {
             self.METHOD_BANDPASS: {
@@ -81,6 +107,14 @@ class Denoiser:
             }
         }
         
+        # Фильтр для параметров по умолчанию рассчитывается заранее,
+        # чтобы первый запрос не тратил время на его проектирование
+        try:
+            self._bandpass_sos(self.target_sr)
+        except ValueError:
+            # Слишком низкая частота для диапазона по умолчанию
+            pass
+        
         if self.verbose:
             print(f"Denoiser инициализирован. Метод по умолчанию: {default_method}")
     
@@ -96,7 +130,8 @@ class Denoiser:
         
         Args:
             audio: Аудиоданные, путь к файлу или bytes
-            sr: Частота дискретизации (если audio это массив)
+            sr: Частота дискретизации массива или частота загрузки файла
+                (если None - target_sr)
             method: Метод очистки (если None, используется default_method)
             **kwargs: Дополнительные параметры для метода
             
@@ -117,22 +152,7 @@ class Denoiser:
         method = method or self.default_method
         
         # Загружаем аудио, если нужно
-        if isinstance(audio, (str, Path, bytes)):
-            audio_data, orig_sr = AudioIO.load_audio(audio, sr=self.target_sr)
-        else:
-            audio_data = audio
-            orig_sr = sr or self.target_sr
-            try:
-                # Ресемплируем, если нужно
-                if sr is not None and orig_sr != sr:
-                    audio_data = AudioIO.resample_audio(audio_data, orig_sr, sr)
-                    orig_sr = sr
-
-                elif orig_sr != self.target_sr:
-                    audio_data = AudioIO.resample_audio(audio_data, orig_sr, self.target_sr)
-                    orig_sr = self.target_sr
-            except Exception as e:
-                print(e)
+        audio_data, orig_sr = self._prepare_audio(audio, sr)
         
         # Сохраняем оригинальную форму
         original_shape = audio_data.shape
@@ -156,12 +176,12 @@ class Denoiser:
         else:
             raise ValueError(f"Неизвестный метод: {method}")
         
-        # Нормализуем результат
         if method != self.METHOD_ADAPTIVE and method != self.METHOD_BANDPASS:
-            denoised_audio = AudioIO.normalize_audio(denoised_audio)
-        
-            # Обрезаем тишину
+            # Обрезаем тишину (порог относительный, нормализация не нужна)
             denoised_audio = AudioIO.trim_silence(denoised_audio, orig_sr)
+            
+            # Нормализуем результат один раз, уже после обрезки
+            denoised_audio = AudioIO.normalize_audio(denoised_audio)
         
         # Вычисляем метрики
         processing_time = time.time() - start_time
@@ -178,9 +198,199 @@ class Denoiser:
             'denoised_shape': denoised_audio.shape
         }
     
-    def _bandpass_filter(
+    def denoise_batch(
+        self,
+        audios: List[Union[np.ndarray, str, Path, bytes]],
+        sr: Optional[int] = None,
+        method: Optional[str] = None,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
+        """
+        Очищает несколько аудиосигналов за один вызов.
+        
+        Для методов из BATCHED_METHODS сигналы дополняются нулями до общей
+        длины и обрабатываются одним STFT по массиву формы (B, T); результат
+        для каждого сигнала совпадает с denoise(). Сигналы короче сегмента
+        оценки шума обрабатываются через denoise().
+        Остальные методы обрабатываются поочередно через denoise().
+        
+        Args:
+            audios: Список аудиоданных, путей к файлам или bytes
+            sr: Частота дискретизации массивов или частота загрузки файлов
+                (если None - target_sr)
+            method: Метод очистки (если None, используется default_method)
+            **kwargs: Дополнительные параметры для метода
+            
+        Returns:
+            Список словарей с результатами в том же порядке, что и audios
+        """
+        import time
+        start_time = time.time()
+        
+        method = method or self.default_method
+        
+        if method not in self.BATCHED_METHODS or len(audios) < 2:
+            return [self.denoise(audio, sr=sr, method=method, **kwargs) for audio in audios]
+        
+        prepared = [self._prepare_audio(audio, sr) for audio in audios]
+        sample_rates = {audio_sr for _, audio_sr in prepared}
+        
+        # Разные частоты дискретизации нельзя объединить в один пакет
+        if len(sample_rates) > 1:
+            return [self.denoise(audio, sr=sr, method=method, **kwargs) for audio in audios]
+        
+        batch_sr = sample_rates.pop()
+        lengths = [len(audio_data) for audio_data, _ in prepared]
+        
+        # У сигналов короче сегмента оценки шума дополнение нулями меняет
+        # профиль шума - такие обрабатываются поштучно через denoise()
+        noise_samples = int(kwargs.get('noise_duration', 0.5) * batch_sr)
+        batched = [i for i, length in enumerate(lengths) if length >= noise_samples]
+        if len(batched) < 2:
+            return [self.denoise(audio, sr=sr, method=method, **kwargs) for audio in audios]
+        
+        batch_lengths = [lengths[i] for i in batched]
+        
+        # Стек сигналов (B, T), дополненных нулями до максимальной длины
+        batch = np.zeros((len(batched), max(batch_lengths)), dtype=np.float32)
+        for row, i in enumerate(batched):
+            batch[row, :lengths[i]] = prepared[i][0]
+        
+        # lengths: каждая строка восстанавливается только по своим кадрам,
+        # поэтому результат совпадает с denoise() для того же сигнала
+        if method == self.METHOD_WIENER:
+            denoised_batch = self._wiener_filter(batch, batch_sr, lengths=batch_lengths, **kwargs)
+        elif get_torch_device() is not None:
+            denoised_batch = self._spectral_subtraction_torch(batch, batch_sr, lengths=batch_lengths, **kwargs)
+        else:
+            denoised_batch = self._spectral_subtraction(batch, batch_sr, lengths=batch_lengths, **kwargs)
+        
+        # Время пакета распределяется поровну между файлами пакета
+        processing_time = (time.time() - start_time) / len(batched)
+        
+        results = [None] * len(audios)
+        for row, i in enumerate(batched):
+            audio_data = prepared[i][0]
+            denoised_audio = AudioIO.trim_silence(denoised_batch[row, :lengths[i]], batch_sr)
+            denoised_audio = AudioIO.normalize_audio(denoised_audio)
+            
+            results[i] = {
+                'audio': denoised_audio,
+                'sample_rate': batch_sr,
+                'method': method,
+                'processing_time': processing_time,
+                'original_shape': audio_data.shape,
+                'denoised_shape': denoised_audio.shape
+            }
+        
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = self.denoise(audios[i], sr=sr, method=method, **kwargs)
+        
+        if self.verbose:
+            print(f"Пакетная обработка завершена. Метод: {method}, файлов: {len(results)}")
+        
+        return results
+    
+    def _scratch_buffer(self, name: str, shape: Tuple[int, ...], dtype=np.float32) -> np.ndarray:
+        """
+        Возвращает постоянный рабочий буфер нужной формы.
+        
+        Буфер переиспользуется между вызовами и пересоздается только
+        если текущего не хватает, поэтому содержимое не сохраняется.
+        Массивы больше SCRATCH_MAX_ELEMENTS не кешируются.
+        
+        Args:
+            name: Имя буфера
+            shape: Требуемая форма
+            dtype: Тип данных
+            
+        Returns:
+            Массив формы shape (представление буфера)
+        """
+        size = int(np.prod(shape))
+        if size > self.SCRATCH_MAX_ELEMENTS:
+            return np.empty(shape, dtype=dtype)
+        
+        buffer = getattr(self._scratch, name, None)
+        
+        if buffer is None or buffer.size < size or buffer.dtype != dtype:
+            buffer = np.empty(size, dtype=dtype)
+            setattr(self._scratch, name, buffer)
+        
+        return buffer[:size].reshape(shape)
+    
+    @staticmethod
+    def _istft_rows(
+        stft_matrix: np.ndarray,
+        hop_length: int,
+        length: int,
+        lengths: Optional[List[int]] = None
+    ) -> np.ndarray:
+        """
+        Обратное STFT с учетом исходных длин сигналов пакета.
+        
+        Кадры за концом короткого сигнала перекрывают его последние
+        семплы и при общем ISTFT меняют хвост. Поэтому при заданных lengths
+        каждая строка восстанавливается только по своим 1 + L // hop_length
+        кадрам - ровно тем, что дает STFT этого сигнала без дополнения.
+        
+        Args:
+            stft_matrix: Спектрограмма (или пакет формы (B, F, кадры))
+            hop_length: Шаг между окнами
+            length: Длина выходного сигнала
+            lengths: Исходные длины строк пакета (если None - общий ISTFT)
+            
+        Returns:
+            Аудиосигнал (или пакет формы (B, length), дополненный нулями)
+        """
+        if lengths is None:
+            return STFTUtils.istft(stft_matrix, hop_length=hop_length, length=length)
+        
+        audio_clean = np.zeros((len(lengths), length), dtype=np.float32)
+        for row, row_length in enumerate(lengths):
+            n_frames = 1 + row_length // hop_length
+            audio_clean[row, :row_length] = STFTUtils.istft(
+                stft_matrix[row, :, :n_frames], hop_length=hop_length, length=row_length
+            )
+        
+        return audio_clean
+    
+    def _prepare_audio(
+        self,
+        audio: Union[np.ndarray, str, Path, bytes],
+        sr: Optional[int] = None
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Загружает аудио (если передан путь или bytes) и приводит частоту дискретизации.
+        
+        Args:
+            audio: Аудиоданные, путь к файлу или bytes
+            sr: Частота дискретизации массива или частота загрузки файла
+                (если None - target_sr)
+            
+        Returns:
+            Tuple[аудиосигнал, частота дискретизации]
+        """
+        if isinstance(audio, (str, Path, bytes)):
+            # Файл сразу загружается с нужной частотой - без повторного ресемплинга
+            audio_data, orig_sr = AudioIO.load_audio(audio, sr=sr or self.target_sr)
+        else:
+            # Массив без sr считается уже записанным с target_sr;
+            # ресемплинг выполняется только при явно другой частоте
+            audio_data = audio
+            orig_sr = sr or self.target_sr
+            if orig_sr != self.target_sr:
+                audio_data = AudioIO.resample_audio(audio_data, orig_sr, self.target_sr)
+                orig_sr = self.target_sr
+        
+        # Вся обработка ведется во float32 (вдвое меньше памяти, чем float64)
+        audio_data = np.asarray(audio_data, dtype=np.float32)
+        
+        return audio_data, orig_sr
+    
+    def _bandpass_sos(
         self,
-        audio: np.ndarray,
         sr: int,
         lowcut: Optional[float] = 80,
         highcut: Optional[float] = 8000,
@@ -188,10 +398,9 @@ class Denoiser:
         voice_type: str = 'broadband'
     ) -> np.ndarray:
         """
-        Полосовая фильтрация (лучший метод по тестам).
+        Рассчитывает полосовой фильтр Баттерворта (каскад биквадов).
         
         Args:
-            audio: Входной аудиосигнал
             sr: Частота дискретизации
             lowcut: Нижняя частота среза (Гц)
             highcut: Верхняя частота среза (Гц)
@@ -199,7 +408,7 @@ class Denoiser:
             voice_type: Тип голоса для выбора диапазона
             
         Returns:
-            Отфильтрованный аудиосигнал
+            Коэффициенты фильтра в форме SOS
         """
         # Выбираем диапазон частот
         if lowcut is None or highcut is None:
@@ -220,10 +429,37 @@ class Denoiser:
         high = highcut / nyquist
 
         # Создание фильтра Баттерворта
-        b, a = signal.butter(order, [low, high], btype='band')
+        return _butter_sos(order, low, high)
+    
+    def _bandpass_filter(
+        self,
+        audio: np.ndarray,
+        sr: int,
+        lowcut: Optional[float] = 80,
+        highcut: Optional[float] = 8000,
+        order: int = 5,
+        voice_type: str = 'broadband'
+    ) -> np.ndarray:
+        """
+        Полосовая фильтрация (лучший метод по тестам).
+        
+        Args:
+            audio: Входной аудиосигнал
+            sr: Частота дискретизации
+            lowcut: Нижняя частота среза (Гц)
+            highcut: Верхняя частота среза (Гц)
+            order: Порядок фильтра
+            voice_type: Тип голоса для выбора диапазона
+            
+        Returns:
+            Отфильтрованный аудиосигнал
+        """
+        # Фильтр Баттерворта (коэффициенты кешируются)
+        sos = self._bandpass_sos(sr, lowcut, highcut, order, voice_type)
         
         # Применение фильтра с нулевой фазовой задержкой
-        audio_filtered = signal.filtfilt(b, a, audio)
+        # (коэффициенты float64 повышают тип результата - возвращаем float32)
+        audio_filtered = signal.sosfiltfilt(sos, audio).astype(np.float32, copy=False)
         
         # Дополнительно: применямем notch фильтр для удаления сетевой частоты (50 Гц)
         #if 45 <= lowcut <= 55 or 45 <= highcut <= 55:
@@ -278,10 +514,10 @@ class Denoiser:
         w0 = freq / (sr / 2)
         
         # Создание notch фильтра
-        b, a = signal.iirnotch(w0, Q)
+        sos = _notch_sos(w0, Q)
         
         # Применение фильтра
-        return signal.filtfilt(b, a, audio)
+        return signal.sosfiltfilt(sos, audio).astype(np.float32, copy=False)
     
     def _spectral_subtraction(
         self,
@@ -291,7 +527,8 @@ class Denoiser:
         hop_length: int = 512,
         over_subtraction: float = 1.5,
         spectral_floor: float = 0.01,
-        noise_duration: float = 0.5
+        noise_duration: float = 0.5,
+        lengths: Optional[List[int]] = None
     ) -> np.ndarray:
         """
         Спектральное вычитание.
@@ -304,6 +541,7 @@ class Denoiser:
             over_subtraction: Коэффициент перевычитания
             spectral_floor: Минимальный уровень спектра
             noise_duration: Длительность сегмента для оценки шума
+            lengths: Исходные длины сигналов пакета, дополненного нулями
             
         Returns:
             Очищенный аудиосигнал
@@ -319,68 +557,196 @@ class Denoiser:
         # STFT преобразование
         stft_matrix = STFTUtils.stft(audio, n_fft=n_fft, hop_length=hop_length)
         
-        # Спектральное вычитание
+        # Спектральное вычитание на месте: фаза уже содержится в stft_matrix
         stft_clean = STFTUtils.spectral_subtraction(
             stft_matrix,
             noise_profile,
             over_subtraction=over_subtraction,
-            spectral_floor=spectral_floor
+            spectral_floor=spectral_floor,
+            out=stft_matrix
         )
         
         # Обратное STFT
-        audio_clean = STFTUtils.istft(stft_clean, hop_length=hop_length, length=len(audio))
+        audio_clean = self._istft_rows(stft_clean, hop_length, audio.shape[-1], lengths)
         
         return audio_clean
     
+    def _spectral_subtraction_torch(
+        self,
+        audio: np.ndarray,
+        sr: int,
+        n_fft: int = 2048,
+        hop_length: int = 512,
+        over_subtraction: float = 1.5,
+        spectral_floor: float = 0.01,
+        noise_duration: float = 0.5,
+        lengths: Optional[List[int]] = None
+    ) -> np.ndarray:
+        """
+        Спектральное вычитание пакета сигналов на GPU (PyTorch).
+        
+        Профиль шума оценивается на CPU по короткому начальному сегменту,
+        STFT, маска и ISTFT для всего пакета выполняются на GPU.
+        
+        Args:
+            audio: Пакет сигналов формы (B, T)
+            sr: Частота дискретизации
+            n_fft: Размер окна FFT
+            hop_length: Шаг между окнами
+            over_subtraction: Коэффициент перевычитания
+            spectral_floor: Минимальный уровень спектра
+            noise_duration: Длительность сегмента для оценки шума
+            lengths: Исходные длины сигналов (каждая строка восстанавливается
+                по своим кадрам, как в _istft_rows)
+            
+        Returns:
+            Очищенные сигналы формы (B, T)
+        """
+        import torch
+        
+        device = get_torch_device()
+        
+        noise_profile = STFTUtils.estimate_noise_profile(
+            audio, sr,
+            noise_duration=noise_duration,
+            n_fft=n_fft,
+            hop_length=hop_length
+        )
+        
+        with torch.no_grad():
+            audio_gpu = torch.from_numpy(np.ascontiguousarray(audio)).to(device)
+            noise_scaled = torch.from_numpy(noise_profile.astype(np.float32)).to(device)
+            noise_scaled *= over_subtraction
+            window = torch.hann_window(n_fft, device=device)
+            
+            stft_matrix = STFTUtils.stft_torch(audio_gpu, n_fft=n_fft, hop_length=hop_length, window=window)
+            
+            # Та же вещественная маска и нижняя граница |X|, что и в
+            # STFTUtils.spectral_subtraction (без переполнения на нулевых бинах)
+            gain = stft_matrix.abs().clamp_min_(1e-10)
+            gain = torch.div(noise_scaled, gain, out=gain).neg_().add_(1.0).clamp_min_(spectral_floor)
+            stft_matrix *= gain
+            
+            if lengths is None:
+                audio_clean = STFTUtils.istft_torch(
+                    stft_matrix, hop_length=hop_length, window=window, length=audio.shape[-1]
+                )
+                return audio_clean.cpu().numpy()
+            
+            audio_clean = np.zeros(audio.shape, dtype=np.float32)
+            for row, row_length in enumerate(lengths):
+                n_frames = 1 + row_length // hop_length
+                audio_clean[row, :row_length] = STFTUtils.istft_torch(
+                    stft_matrix[row:row + 1, :, :n_frames],
+                    hop_length=hop_length, window=window, length=row_length
+                )[0].cpu().numpy()
+            return audio_clean
+    
     def _wiener_filter(
         self,
         audio: np.ndarray,
         sr: int,
         n_fft: int = 2048,
         hop_length: int = 512,
-        smoothing: float = 0.98
+        smoothing: float = 0.98,
+        lengths: Optional[List[int]] = None
     ) -> np.ndarray:
         """
         Адаптивный фильтр Винера.
         
         Args:
-            audio: Входной аудиосигнал
+            audio: Входной аудиосигнал (или пакет сигналов формы (B, T))
             sr: Частота дискретизации
             n_fft: Размер окна FFT
             hop_length: Шаг между окнами
             smoothing: Коэффициент сглаживания
+            lengths: Исходные длины сигналов пакета, дополненного нулями
             
         Returns:
             Очищенный аудиосигнал
         """
         # STFT преобразование
         stft_matrix = STFTUtils.stft(audio, n_fft=n_fft, hop_length=hop_length)
-        magnitude, phase = STFTUtils.get_magnitude_phase(stft_matrix)
+        magnitude = np.abs(stft_matrix, out=self._scratch_buffer('magnitude', stft_matrix.shape))
         
         # Оценка PSD шума из первых кадров
         noise_frames = int(0.5 * sr / hop_length)
-        if noise_frames < magnitude.shape[1]:
-            noise_psd = np.mean(np.abs(stft_matrix[:, :noise_frames]) ** 2, axis=1)
-        else:
-            noise_psd = np.mean(np.abs(stft_matrix) ** 2, axis=1)
-        
-        # Адаптивный фильтр Винера
-        magnitude_squared = magnitude ** 2
-        signal_psd_est = np.maximum(magnitude_squared - noise_psd[:, np.newaxis], 0)
-        prior_snr = signal_psd_est / (noise_psd[:, np.newaxis] + 1e-10)
+        noise_psd = np.mean(magnitude[..., :noise_frames] ** 2, axis=-1, keepdims=True)
+        
+        # Адаптивный фильтр Винера: вес prior_snr / (prior_snr + 1) при
+        # prior_snr = est / (noise + eps) равен est / (est + noise + eps);
+        # считаем его на месте в одном буфере вместо пяти промежуточных массивов
+        weights = np.square(magnitude, out=magnitude)
+        weights -= noise_psd
+        np.maximum(weights, 0, out=weights)
+        denominator = np.add(
+            weights, noise_psd + 1e-10,
+            out=self._scratch_buffer('denominator', weights.shape)
+        )
+        weights /= denominator
         
-        # Веса Винера
-        wiener_weights = prior_snr / (prior_snr + 1)
-        
-        # Применение фильтра
-        magnitude_clean = magnitude * wiener_weights
+        # Применение фильтра на месте (вещественный вес не меняет фазу)
+        stft_matrix *= weights
+        stft_clean = stft_matrix
         
         # Обратное STFT
-        stft_clean = STFTUtils.combine_magnitude_phase(magnitude_clean, phase)
-        audio_clean = STFTUtils.istft(stft_clean, hop_length=hop_length, length=len(audio))
+        audio_clean = self._istft_rows(stft_clean, hop_length, audio.shape[-1], lengths)
         
         return audio_clean
     
+    def _spectral_wiener(
+        self,
+        audio: np.ndarray,
+        sr: int,
+        n_fft: int = 2048,
+        hop_length: int = 512,
+        over_subtraction: float = 1.5,
+        spectral_floor: float = 0.01,
+        noise_duration: float = 0.5
+    ) -> np.ndarray:
+        """
+        Спектральное вычитание, затем фильтр Винера - за одно STFT.
+        
+        Оба этапа считаются как вещественные маски над одной спектрограммой,
+        без промежуточного iSTFT и повторного STFT. Шум для обоих этапов
+        оценивается по первым noise_duration секундам.
+        
+        Args:
+            audio: Входной аудиосигнал
+            sr: Частота дискретизации
+            n_fft: Размер окна FFT
+            hop_length: Шаг между окнами
+            over_subtraction: Коэффициент перевычитания
+            spectral_floor: Минимальный уровень спектра
+            noise_duration: Длительность сегмента для оценки шума
+            
+        Returns:
+            Очищенный аудиосигнал
+        """
+        stft_matrix = STFTUtils.stft(audio, n_fft=n_fft, hop_length=hop_length)
+        magnitude = np.abs(stft_matrix)
+        noise_frames = min(max(int(noise_duration * sr / hop_length), 1), magnitude.shape[1])
+        
+        # 1. Спектральное вычитание
+        noise_profile = np.mean(magnitude[:, :noise_frames], axis=1, keepdims=True)
+        magnitude_clean = np.maximum(
+            magnitude - over_subtraction * noise_profile,
+            spectral_floor * magnitude
+        )
+        
+        # 2. Фильтр Винера по остаточному шуму после вычитания
+        noise_psd = np.mean(magnitude_clean[:, :noise_frames] ** 2, axis=1, keepdims=True)
+        weights = np.square(magnitude_clean)
+        weights -= noise_psd
+        np.maximum(weights, 0, out=weights)
+        weights /= weights + (noise_psd + 1e-10)
+        
+        # Итоговая амплитуда |X_clean| * w с фазой исходного спектра
+        weights *= magnitude_clean
+        stft_clean = STFTUtils.combine_from_original(stft_matrix, magnitude, weights)
+        
+        return STFTUtils.istft(stft_clean, hop_length=hop_length, length=len(audio))
+    
     def _noisereduce_filter(
         self,
         audio: np.ndarray,
@@ -404,8 +770,9 @@ class Denoiser:
         Returns:
             Очищенный аудиосигнал
         """
-        # Оценка шума из первых 0.5 секунд
-        noise_clip = audio[:int(0.5 * sr)]
+        # Оценка шума из первых 0.5 секунд (noisereduce использует ее только
+        # в стационарном режиме; нестационарный оценивает шум сам)
+        noise_clip = audio[:int(0.5 * sr)] if stationary else None
         
         # Применение noisereduce
         audio_clean = nr.reduce_noise(
@@ -445,7 +812,7 @@ class Denoiser:
         audio_stage1 = audio
         
         # 2. Оценка уровня шума
-        noise_level = self._estimate_noise_level(audio_stage1)
+        noise_level = self._estimate_noise_level(audio_stage1, sr)
         
         if self.verbose:
             print(f"Уровень шума: {noise_level:.4f}")
@@ -461,17 +828,23 @@ class Denoiser:
             return audio_stage2
         
         else:  # Высокий уровень шума
-            # Используем noisereduce
-            #audio_stage2 = self._spectral_subtraction(audio_stage1, sr)
-            audio_stage3 = self._noisereduce_filter(audio_stage2, sr)
+            # Спектральное вычитание и фильтр Винера за одно STFT
+            audio_stage3 = self._spectral_wiener(audio_stage1, sr)
             return audio_stage3
     
-    def _estimate_noise_level(self, audio: np.ndarray) -> float:
+    def _estimate_noise_level(
+        self,
+        audio: np.ndarray,
+        sr: Optional[int] = None,
+        max_duration: float = 30.0
+    ) -> float:
         """
         Оценивает уровень шума в сигнале.
         
         Args:
             audio: Аудиосигнал
+            sr: Частота дискретизации (если None - анализируется весь сигнал)
+            max_duration: Максимальная длительность анализируемого фрагмента (сек)
             
         Returns:
             Уровень шума (0.0 - 1.0)
@@ -479,16 +852,29 @@ class Denoiser:
         # Используем отношение энергии в высоких частотах к общей энергии
         # Шум обычно имеет больше высокочастотных компонент
         
-        # FFT
-        fft_result = np.fft.fft(audio)
-        freqs = np.fft.fftfreq(len(audio))
+        # Для грубой оценки достаточно начала записи - FFT по всему
+        # многоминутному сигналу не нужен
+        if sr is not None:
+            audio = audio[:int(max_duration * sr)]
+        
+        if len(audio) == 0:
+            return 0.0
+        
+        # FFT вещественного сигнала: только неотрицательные частоты
+        # Длина FFT дополняется нулями до ближайшей "быстрой" (гладкой)
+        n = scipy.fft.next_fast_len(len(audio), real=True)
+        spectrum = scipy.fft.rfft(audio, n=n)
+        power_spectrum = spectrum.real * spectrum.real + spectrum.imag * spectrum.imag
+        
+        # Внутренние бины соответствуют паре сопряженных бинов полного FFT
+        # (DC и частота Найквиста не дублируются)
+        power_spectrum[1:(n + 1) // 2] *= 2
         
-        # Мощность в разных частотных диапазонах
-        mask_low = np.abs(freqs) < 0.1  # Низкие частоты
-        mask_high = np.abs(freqs) > 0.3  # Высокие частоты
+        # Мощность в высоких частотах (нормированная частота k / n > 0.3)
+        high_start = int(0.3 * n) + 1
         
-        power_total = np.sum(np.abs(fft_result) ** 2)
-        power_high = np.sum(np.abs(fft_result[mask_high]) ** 2)
+        power_total = np.sum(power_spectrum)
+        power_high = np.sum(power_spectrum[high_start:])
         
         if power_total > 0:
             noise_ratio = power_high / power_total
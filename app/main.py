@@ -7,9 +7,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 from pathlib import Path
+import logging
+import time
 
 from .config import settings
-from .api.routes import router
+from .core import enable_pyfftw_backend
+from .api import errors
+from .api.routes import router, api_error_handler, generic_error_handler
+from .api.dependencies import start_process_pool, shutdown_process_pool
+
+logger = logging.getLogger("api")
 
 # Создаем FastAPI приложение
 app = FastAPI(
@@ -33,7 +40,8 @@ app = FastAPI(
     """,
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    default_response_class=errors.ORJSONResponse
 )
 
 # Настройка CORS
@@ -52,15 +60,14 @@ app.mount("/processed", StaticFiles(directory=settings.PROCESSED_DIR), name="pro
 # Подключаем роутеры
 app.include_router(router)
 
+# Регистрация обработчиков ошибок (по одному на тип исключения)
+app.add_exception_handler(errors.APIError, api_error_handler)
+app.add_exception_handler(Exception, generic_error_handler)
+
 # Middleware для логирования
 @app.middleware("http")
 async def log_requests(request, call_next):
     """Middleware для логирования запросов."""
-    import time
-    import logging
-    
-    logger = logging.getLogger("api")
-    
     start_time = time.time()
     
     # Логируем входящий запрос
@@ -87,11 +94,19 @@ async def startup_event():
     print(f"📁 Загрузки: {settings.UPLOAD_DIR}")
     print(f"📁 Обработанные файлы: {settings.PROCESSED_DIR}")
     print(f"🌐 Документация: http://{settings.HOST}:{settings.PORT}/docs")
+    
+    # Ускоренный FFT-бэкенд, если установлен pyFFTW
+    if enable_pyfftw_backend():
+        print("⚡ FFT бэкенд: pyFFTW")
+    
+    # Пул процессов обработки создается до первого запроса
+    await start_process_pool()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Действия при остановке приложения."""
+    shutdown_process_pool()
     print("👋 Приложение остановлено")
 
 
@@ -5,42 +5,140 @@
 import aiohttp
 import asyncio
 from pathlib import Path
-from typing import Dict, Any, Optional, BinaryIO
-import json
+from typing import Dict, Any, Optional, BinaryIO, List, Tuple, Union, AsyncIterator, Awaitable, Callable
+import functools
+import orjson
 import logging
 
+try:
+    import aiofiles
+except ImportError:
+    # Без aiofiles читаем файл в пуле потоков
+    aiofiles = None
+
 from .config import settings
 
 logger = logging.getLogger(__name__)
 
+UPLOAD_CHUNK_SIZE = 64 * 1024  # Размер блока при потоковой отправке файла
+
+
+def _ttl_cache(ttl: float, cache_if: Callable[[Any], bool] = lambda result: True):
+    """
+    Кеширует результат асинхронной функции без аргументов на ttl секунд.
+    
+    Одновременные вызовы во время запроса ждут одну и ту же задачу,
+    так что к API уходит не больше одного запроса.
+    
+    Args:
+        ttl: Время жизни результата в секундах
+        cache_if: Условие сохранения результата (ошибки не кешируются)
+    """
+    def decorator(func: Callable[[], Awaitable[Any]]):
+        expires_at = 0.0
+        value = None
+        pending: Optional[asyncio.Task] = None
+        
+        @functools.wraps(func)
+        async def wrapper():
+            nonlocal expires_at, value, pending
+            
+            loop = asyncio.get_running_loop()
+            if loop.time() < expires_at:
+                return value
+            
+            if pending is None or pending.done():
+                pending = asyncio.ensure_future(func())
+            task = pending
+            
+            result = await asyncio.shield(task)
+            if task is pending and cache_if(result):
+                value, expires_at = result, loop.time() + ttl
+            return result
+        
+        def cache_clear():
+            nonlocal expires_at
+            expires_at = 0.0
+        
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
+
+async def _iter_file(path: Path, chunk_size: int = UPLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Читает файл блоками, не блокируя event loop.
+    
+    Args:
+        path: Путь к файлу
+        chunk_size: Размер блока в байтах
+        
+    Yields:
+        Очередной блок данных
+    """
+    if aiofiles is not None:
+        async with aiofiles.open(path, 'rb') as f:
+            while chunk := await f.read(chunk_size):
+                yield chunk
+    else:
+        f = await asyncio.to_thread(open, path, 'rb')
+        try:
+            while chunk := await asyncio.to_thread(f.read, chunk_size):
+                yield chunk
+        finally:
+            f.close()
+
 
 class APIClient:
     """Асинхронный клиент для работы с API."""
     
-    def __init__(self, base_url: str = None, timeout: int = None):
+    def __init__(self, base_url: str = None, timeout: int = None, persistent: bool = False):
         """
         Инициализация клиента.
         
         Args:
             base_url: Базовый URL API
             timeout: Таймаут запросов в секундах
+            persistent: Не закрывать сессию при выходе из контекстного
+                менеджера (keep-alive соединения переиспользуются между
+                вызовами; закрывается через close())
         """
         self.base_url = base_url or settings.API_URL
         self.timeout = timeout or settings.API_TIMEOUT
+        self.persistent = persistent
         self.session: Optional[aiohttp.ClientSession] = None
     
+    async def open(self) -> aiohttp.ClientSession:
+        """Создает сессию с пулом keep-alive соединений, если ее еще нет."""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.API_MAX_CONNECTIONS,
+                limit_per_host=settings.API_MAX_CONNECTIONS,
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": f"VoiceDenoiserBot/{settings.__version__}"}
+            )
+        return self.session
+    
     async def __aenter__(self):
-        """Создает сессию при входе в контекстный менеджер."""
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=self.timeout),
-            headers={"User-Agent": f"VoiceDenoiserBot/{settings.__version__}"}
-        )
+        """Создает (или переиспользует) сессию при входе в контекстный менеджер."""
+        await self.open()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Закрывает сессию при выходе из контекстного менеджера."""
-        if self.session:
+        """Закрывает сессию при выходе из контекстного менеджера (кроме persistent)."""
+        if not self.persistent:
+            await self.close()
+    
+    async def close(self):
+        """Закрывает сессию и пул соединений."""
+        if self.session and not self.session.closed:
             await self.session.close()
+        self.session = None
     
     async def health_check(self) -> bool:
         """
@@ -66,7 +164,7 @@ class APIClient:
         try:
             async with self.session.get(f"{self.base_url}/api/methods") as response:
                 if response.status == 200:
-                    return await response.json()
+                    return await response.json(loads=orjson.loads)
                 else:
                     logger.error(f"Failed to get methods: {response.status}")
                     return {}
@@ -76,26 +174,34 @@ class APIClient:
     
     async def denoise_audio(
         self,
-        audio_file: BinaryIO,
+        audio_file: Union[Path, BinaryIO],
         filename: str,
         method: str = "noisereduce",
         sample_rate: Optional[int] = None,
-        voice_type: Optional[str] = "broadband"
+        voice_type: Optional[str] = "broadband",
+        direct: bool = False
     ) -> Dict[str, Any]:
         """
         Отправляет аудио на очистку.
         
         Args:
-            audio_file: Файловый объект с аудио
+            audio_file: Путь к файлу (отправляется потоково блоками по 64 КБ)
+                или файловый объект с аудио
             filename: Имя файла
             method: Метод очистки
             sample_rate: Целевая частота дискретизации
             voice_type: Тип голоса
+            direct: Запросить очищенное аудио прямо в ответе
+                (без отдельного запроса на скачивание)
             
         Returns:
-            Результат обработки
+            Результат обработки; при direct=True и поддержке сервером
+            аудио находится в ключе "audio_data"
         """
         # Подготавливаем данные формы
+        if isinstance(audio_file, Path):
+            audio_file = _iter_file(audio_file)
+        
         data = aiohttp.FormData()
         data.add_field(
             "audio_file",
@@ -112,14 +218,27 @@ class APIClient:
         if method == "bandpass":
             data.add_field("voice_type", voice_type)
         
+        headers = {"Accept": "application/octet-stream, application/json"} if direct else None
+        
         try:
             async with self.session.post(
                 f"{self.base_url}/api/denoise",
-                data=data
+                data=data,
+                headers=headers
             ) as response:
                 
-                if response.status == 200:
-                    return await response.json()
+                if response.status == 200 and response.content_type.startswith("audio/"):
+                    return {
+                        "audio_data": await response.read(),
+                        "method": response.headers.get("X-Method", method),
+                        "processing_time": float(response.headers.get("X-Processing-Time", 0)),
+                        "original_info": {
+                            "duration": float(response.headers.get("X-Duration", 0)),
+                            "sample_rate": int(response.headers.get("X-Sample-Rate", 0))
+                        }
+                    }
+                elif response.status == 200:
+                    return await response.json(loads=orjson.loads)
                 else:
                     error_text = await response.text()
                     logger.error(f"Denoise failed: {response.status} - {error_text}")
@@ -158,6 +277,44 @@ class APIClient:
             logger.error(f"Download error: {e}")
             raise
     
+    async def download_to_file(
+        self,
+        url: str,
+        path: Path,
+        chunk_size: int = UPLOAD_CHUNK_SIZE
+    ) -> Path:
+        """
+        Скачивает файл по абсолютному URL потоково, блоками в файл.
+        
+        Весь файл в памяти не держится, запись на диск не блокирует event loop.
+        
+        Args:
+            url: Абсолютный URL файла
+            path: Куда сохранить
+            chunk_size: Размер блока в байтах
+            
+        Returns:
+            Путь к сохраненному файлу
+        """
+        session = await self.open()
+        async with session.get(url) as response:
+            if response.status != 200:
+                raise Exception(f"Download failed: {response.status}")
+            
+            if aiofiles is not None:
+                async with aiofiles.open(path, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(chunk_size):
+                        await f.write(chunk)
+            else:
+                f = await asyncio.to_thread(open, path, 'wb')
+                try:
+                    async for chunk in response.content.iter_chunked(chunk_size):
+                        await asyncio.to_thread(f.write, chunk)
+                finally:
+                    f.close()
+        
+        return path
+    
     async def get_stats(self) -> Dict[str, Any]:
         """
         Получает статистику API.
@@ -168,13 +325,39 @@ class APIClient:
         try:
             async with self.session.get(f"{self.base_url}/api/stats") as response:
                 if response.status == 200:
-                    return await response.json()
+                    return await response.json(loads=orjson.loads)
                 else:
                     return {}
         except Exception as e:
             logger.error(f"Error getting stats: {e}")
             return {}
     
+    async def denoise_many(
+        self,
+        files: List[Tuple[str, Union[Path, BinaryIO]]],
+        method: str = "noisereduce",
+        **kwargs
+    ) -> List[Any]:
+        """
+        Отправляет несколько файлов на очистку параллельными запросами.
+        
+        Args:
+            files: Список файлов (кортежи (имя, путь или файловый объект))
+            method: Метод очистки
+            **kwargs: Дополнительные параметры denoise_audio
+            
+        Returns:
+            Результаты в порядке files (исключение вместо результата
+            для неудачных запросов)
+        """
+        return await asyncio.gather(
+            *(
+                self.denoise_audio(file_obj, filename, method=method, **kwargs)
+                for filename, file_obj in files
+            ),
+            return_exceptions=True
+        )
+    
     async def batch_denoise(
         self,
         files: list,
@@ -208,7 +391,7 @@ class APIClient:
             ) as response:
                 
                 if response.status == 200:
-                    return await response.json()
+                    return await response.json(loads=orjson.loads)
                 else:
                     error_text = await response.text()
                     logger.error(f"Batch denoise failed: {response.status} - {error_text}")
@@ -219,10 +402,11 @@ class APIClient:
             raise
 
 
-# Создаем глобальный экземпляр клиента
-api_client = APIClient()
+# Создаем глобальный экземпляр клиента (одна сессия на все запросы бота)
+api_client = APIClient(persistent=True)
 
 # Утилиты для работы с API
+@_ttl_cache(settings.API_CACHE_TTL, cache_if=lambda result: result[0])
 async def check_api_health() -> tuple[bool, str]:
     """
     Проверяет доступность API и возвращает статус.
@@ -240,6 +424,7 @@ async def check_api_health() -> tuple[bool, str]:
         return False, f"❌ Ошибка подключения к API: {str(e)}"
 
 
+@_ttl_cache(settings.API_CACHE_TTL, cache_if=lambda result: result.startswith("📋"))
 async def get_methods_list() -> str:
     """
     Получает список методов и форматирует его для сообщения.
@@ -277,6 +462,7 @@ async def process_audio_with_progress(
     file_path: Path,
     filename: str,
     method: str = "noisereduce",
+    client: Optional[APIClient] = None,
     **kwargs
 ) -> tuple[Optional[bytes], Optional[str]]:
     """
@@ -286,45 +472,47 @@ async def process_audio_with_progress(
         file_path: Путь к файлу
         filename: Имя файла
         method: Метод очистки
+        client: Клиент API (если None - общий api_client)
         **kwargs: Дополнительные параметры
         
     Returns:
         tuple[аудио_данные, сообщение_об_ошибке]
     """
     try:
-        # Открываем файл для отправки
-        with open(file_path, 'rb') as f:
-            async with api_client as client:
-                # Отправляем на обработку
-                result = await client.denoise_audio(
-                    f,
-                    filename,
-                    method=method,
-                    **kwargs
-                )
-                
-                # Скачиваем результат
+        async with (client or api_client) as client:
+            # Отправляем на обработку (файл читается потоково)
+            result = await client.denoise_audio(
+                Path(file_path),
+                filename,
+                method=method,
+                direct=True,
+                **kwargs
+            )
+            
+            # Аудио приходит в ответе; ссылка - для серверов без такой поддержки
+            audio_data = result.get("audio_data")
+            if audio_data is None:
                 download_url = result.get("download_url")
                 if not download_url:
                     return None, "❌ Не удалось получить ссылку для скачивания"
                 
                 audio_data = await client.download_audio(download_url)
-                
-                # Формируем информацию о результате
-                processing_time = result.get("processing_time", 0)
-                original_info = result.get("original_info", {})
-                
-                info_message = (
-                    f"✅ Обработка завершена!\n\n"
-                    f"📊 Результаты:\n"
-                    f"• Метод: <b>{result.get('method', 'unknown')}</b>\n"
-                    f"• Время обработки: <b>{processing_time:.2f} сек</b>\n"
-                    f"• Длительность: <b>{original_info.get('duration', 0):.2f} сек</b>\n"
-                    f"• Частота: <b>{original_info.get('sample_rate', 0)} Гц</b>"
-                )
-                
-                return audio_data, info_message
-                
+            
+            # Формируем информацию о результате
+            processing_time = result.get("processing_time", 0)
+            original_info = result.get("original_info", {})
+            
+            info_message = (
+                f"✅ Обработка завершена!\n\n"
+                f"📊 Результаты:\n"
+                f"• Метод: <b>{result.get('method', 'unknown')}</b>\n"
+                f"• Время обработки: <b>{processing_time:.2f} сек</b>\n"
+                f"• Длительность: <b>{original_info.get('duration', 0):.2f} сек</b>\n"
+                f"• Частота: <b>{original_info.get('sample_rate', 0)} Гц</b>"
+            )
+            
+            return audio_data, info_message
+            
     except asyncio.TimeoutError:
         return None, "❌ Превышено время ожидания ответа от сервера"
     except Exception as e:
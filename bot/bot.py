@@ -8,11 +8,8 @@ from pathlib import Path
 import signal
 import sys
 
-from telegram.ext import Application
-from telegram import BotCommand
-
-from . import handlers, utils
-from .config import settings
+from telegram.ext import Application, AIORateLimiter
+from telegram import BotCommand, Update
 
 # Добавляем путь для импорта setup_logging
 project_root = Path(__file__).parent.parent
@@ -44,22 +41,45 @@ class VoiceDenoiserBot:
         self.application = None
         self.is_running = False
         self._shutting_down = False  # Флаг для предотвращения повторного shutdown
+        self._stop_event = asyncio.Event()  # Сигнал остановки основного цикла
         
     async def setup(self):
         """Настройка бота."""
         logger.info("Настройка бота...")
         
-        # Создаем приложение
-        self.application = Application.builder() \
+        # Создаем приложение (обновления разных чатов обрабатываются
+        # конкурентно, долгая очистка не блокирует остальных)
+        builder = Application.builder() \
             .token(settings.BOT_TOKEN) \
-            .build()
+            .concurrent_updates(True)
+        
+        # Ограничение частоты запросов к Telegram (общий и по чатам лимиты)
+        # с повтором после RetryAfter
+        try:
+            builder = builder.rate_limiter(AIORateLimiter(max_retries=3))
+        except RuntimeError as e:
+            logger.warning(f"Ограничитель запросов отключен: {e}")
+        
+        self.application = builder.build()
         
         # Настраиваем команды бота
         await self.setup_commands()
         
+        # Узнаем username бота, если он не задан в окружении
+        if settings.BOT_USERNAME in ("", "any"):
+            try:
+                me = await self.application.bot.get_me()
+                settings.BOT_USERNAME = me.username
+            except Exception as e:
+                logger.warning(f"Не удалось получить username бота: {e}")
+        
         # Настраиваем обработчики
         handlers.setup_handlers(self.application)
         
+        # Открываем общую сессию с API на все время работы бота
+        from .api_client import api_client
+        await api_client.open()
+        
         # Настраиваем обработку сигналов
         self.setup_signal_handlers()
         
@@ -81,16 +101,33 @@ class VoiceDenoiserBot:
 
     
     def setup_signal_handlers(self):
-        """Настраивает обработчики сигналов."""
+        """
+        Настраивает обработчики сигналов.
+        
+        Обработчики регистрируются в работающем event loop и вызываются
+        между его итерациями, а не посреди произвольного кода.
+        """
+        loop = asyncio.get_running_loop()
+        
         for sig in (signal.SIGINT, signal.SIGTERM):
-            signal.signal(sig, self.signal_handler)
+            try:
+                loop.add_signal_handler(sig, self.signal_handler, sig)
+            except NotImplementedError:
+                # Windows: add_signal_handler не поддерживается,
+                # передаем сигнал в loop из обычного обработчика
+                signal.signal(
+                    sig,
+                    lambda signum, frame: loop.call_soon_threadsafe(self.signal_handler, signum)
+                )
 
     async def shutdown(self):
         """Graceful shutdown бота."""
-        #if self._shutting_down:
-        #    return
+        if self._shutting_down:
+            return
         
         self._shutting_down = True
+        self.is_running = False
+        self._stop_event.set()
         logger.info("Завершение работы бота...")
         
         try:
@@ -105,29 +142,66 @@ class VoiceDenoiserBot:
                 await self.application.stop()
                 await self.application.shutdown()
             
+            # Закрываем пул соединений с API
+            from .api_client import api_client
+            await api_client.close()
+            
             # Очищаем временные файлы
             logger.info("Очищаю временные файлы...")
-            utils.cleanup_temp_files()
+            await asyncio.to_thread(utils.cleanup_temp_files)
         
         except Exception as e:
             logger.error(f"Ошибка при завершении работы: {e}")
         finally:
-            logger.info("Бот остановлен")
-            print("👋 Бот остановлен")
-            raise KeyboardInterrupt()
+            logger.info("👋 Бот остановлен")
 
-    def signal_handler(self, signum, frame):
-        """Обработчик сигналов для Unix-систем."""
-        print(f"\n🛑 Получен сигнал {signum}, планирую graceful shutdown...")
+    async def start_polling(self):
+        """
+        Запускает long polling.
         
-        # Создаем асинхронную задачу для shutdown
-        loop = asyncio.get_event_loop()
-        self._shutting_down = True
-        if loop.is_running():
-            asyncio.create_task(self.shutdown())
-        else:
-            # Если loop не запущен, запускаем shutdown синхронно
-            loop.run_until_complete(self.shutdown())
+        Telegram держит запрос getUpdates открытым до POLL_TIMEOUT секунд и
+        отдает все накопившиеся обновления разом; запрашиваются только
+        типы обновлений, для которых есть обработчики.
+        """
+        await self.application.updater.start_polling(
+            timeout=settings.POLL_TIMEOUT,
+            poll_interval=settings.POLL_INTERVAL,
+            allowed_updates=[Update.MESSAGE, Update.CALLBACK_QUERY]
+        )
+    
+    def signal_handler(self, signum):
+        """
+        Обработчик SIGINT/SIGTERM (вызывается из event loop).
+        
+        Останавливает основной цикл; shutdown выполняется один раз
+        при выходе из run().
+        """
+        logger.info(f"🛑 Получен сигнал {signum}, планирую graceful shutdown...")
+        self.is_running = False
+        self._stop_event.set()
+    
+    async def watch_polling(self, interval: float = 30.0):
+        """
+        Периодически проверяет polling и перезапускает его при остановке.
+        
+        Args:
+            interval: Интервал проверки в секундах
+        """
+        while self.is_running:
+            # Ждем события остановки вместо sleep, чтобы shutdown
+            # не дожидался окончания интервала
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=interval)
+                break
+            except asyncio.TimeoutError:
+                pass
+            
+            try:
+                if self.is_running and not self.application.updater.running:
+                    logger.error("Polling остановился, перезапускаем...")
+                    await self.start_polling()
+            except Exception as e:
+                logger.error(f"Ошибка при перезапуске polling: {e}")
     
     async def run(self):
         """Запускает бота."""
@@ -141,24 +215,24 @@ class VoiceDenoiserBot:
         api_available, api_message = await check_api_health()
         
         if not api_available:
-            logger.warning(f"API недоступен: {api_message}")
-            print(f"⚠  Внимание: {api_message}")
-            print("   Проверьте, запущен ли FastAPI сервер.")
-            print("   Для запуска: python run_api.py")
+            logger.warning(
+                f"API недоступен: {api_message}. "
+                "Проверьте, запущен ли FastAPI сервер (python run_api.py)"
+            )
             # Не останавливаемся, бот может работать в офлайн режиме
         else:
             logger.info("API доступен")
         
         # Очищаем старые временные файлы
-        utils.cleanup_temp_files()
+        await asyncio.to_thread(utils.cleanup_temp_files)
         
         # Устанавливаем флаг запуска
         self.is_running = True
         
-        logger.info(f"Бот запущен как @{settings.BOT_USERNAME}")
-        print(f"\n🤖 Бот запущен: @{settings.BOT_USERNAME}")
-        print("   Используйте /start для начала работы")
-        print("   Ctrl+C для остановки\n")
+        logger.info(
+            f"🤖 Бот запущен как @{settings.BOT_USERNAME} "
+            "(/start - начало работы, Ctrl+C - остановка)"
+        )
         
         try:
             # Инициализируем приложение
@@ -166,25 +240,15 @@ class VoiceDenoiserBot:
             await self.application.start()
             
             # Запускаем polling
-            await self.application.updater.start_polling()
+            await self.start_polling()
             
-            # Основной цикл работы бота
-            while self.is_running:
-                try:
-                    # Проверяем, работает ли polling
-                    if not self.application.updater.running:
-                        logger.error("Polling остановился, перезапускаем...")
-                        await self.application.updater.start_polling()
-                    
-                    # Ждем 1 секунду
-                    await asyncio.sleep(1)
-                    
-                    # Периодическая очистка временных файлов
-                    utils.cleanup_temp_files()
-                    
-                except Exception as e:
-                    logger.error(f"Ошибка в основном цикле: {e}")
-                    await asyncio.sleep(5)  # Ждем перед повторной попыткой
+            # Ждем сигнала остановки; polling проверяется отдельной задачей,
+            # временные файлы чистит periodic_cleanup раз в час
+            watchdog = asyncio.create_task(self.watch_polling())
+            try:
+                await self._stop_event.wait()
+            finally:
+                watchdog.cancel()
                     
         except asyncio.CancelledError:
             logger.info("Работа бота отменена")
@@ -203,10 +267,9 @@ def main():
         # Запускаем бота
         asyncio.run(bot.run())
     except KeyboardInterrupt:
-        print("\n👋 Бот остановлен пользователем")
+        logger.info("👋 Бот остановлен пользователем")
     except Exception as e:
-        logger.error(f"Критическая ошибка: {e}")
-        print(f"❌ Критическая ошибка: {e}")
+        logger.error(f"❌ Критическая ошибка: {e}")
         return 1
     
     return 0
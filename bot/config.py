@@ -4,8 +4,8 @@
 
 import os
 from pathlib import Path
-from typing import Optional
-from pydantic_settings import BaseSettings
+from typing import Optional, ClassVar, FrozenSet
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 from typing import List
 
@@ -20,13 +20,19 @@ class BotSettings(BaseSettings):
     # Настройки API
     API_URL:str = os.getenv("API_URL", "http://localhost:8000")
     API_TIMEOUT:int = int(os.getenv("API_TIMEOUT", "60"))
+    API_MAX_CONNECTIONS:int = int(os.getenv("API_MAX_CONNECTIONS", "16"))  # Размер пула соединений
+    API_CACHE_TTL:int = int(os.getenv("API_CACHE_TTL", "60"))  # Кеш статуса API и списка методов, сек
+    
+    # Настройки long polling
+    POLL_TIMEOUT:int = int(os.getenv("POLL_TIMEOUT", "30"))  # Сколько Telegram держит getUpdates, сек
+    POLL_INTERVAL:float = float(os.getenv("POLL_INTERVAL", "0.0"))  # Пауза между запросами getUpdates, сек
     
     # Настройки обработки
     MAX_FILE_SIZE_MB:int = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
-    SUPPORTED_FORMATS: List[str] = [".wav", ".mp3", ".ogg", ".flac", ".m4a", ".aac"]
+    SUPPORTED_FORMATS: ClassVar[FrozenSet[str]] = frozenset({".wav", ".mp3", ".ogg", ".flac", ".m4a", ".aac"})
     
-    # Настройки сообщений
-    WELCOME_MESSAGE: str = (
+    # Настройки сообщений (константы класса - не поля, не участвуют в валидации)
+    WELCOME_MESSAGE: ClassVar[str] = (
         "Я бот для очистки голосовых сообщений от шума.\n\n"
         "Отправьте мне голосовое сообщение или аудиофайл, и я очищу его от фонового шума.\n\n"
         "📌 Поддерживаемые форматы: WAV, MP3, OGG, FLAC, M4A, AAC\n"
@@ -34,7 +40,7 @@ class BotSettings(BaseSettings):
         "Используйте /help для списка команд."
     )
     
-    HELP_MESSAGE: str = (
+    HELP_MESSAGE: ClassVar[str] = (
         "📚 Доступные команды:\n\n"
         "/start - Начать работу с ботом\n"
         "/help - Показать эту справку\n"
@@ -49,6 +55,8 @@ class BotSettings(BaseSettings):
     TEMP_DIR: Path = Path(__file__).parent.parent / "temp"
     MAX_TEMP_FILES: int = 100  # Максимальное количество временных файлов
     TEMP_FILE_LIFETIME: int = 3600  # Время жизни временных файлов в секундах (1 час)
+    MAX_USER_STATES: int = 10000  # Максимальное количество состояний пользователей в памяти
+    USER_STATE_TTL: int = 86400  # Время жизни состояния неактивного пользователя (сутки)
     
     # Логирование
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -57,10 +65,11 @@ class BotSettings(BaseSettings):
     # Администраторы (опционально)
     ADMIN_IDS: list = []
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
-        extra = "allow"
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        case_sensitive=True,
+        extra="allow"
+    )
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -69,14 +78,8 @@ class BotSettings(BaseSettings):
         if self.LOG_FILE:
             self.LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
         
-        # Получаем username бота из токена
-        if not self.BOT_USERNAME and self.BOT_TOKEN:
-            from telegram import Bot
-            try:
-                bot = Bot(self.BOT_TOKEN)
-                self.BOT_USERNAME = bot.get_me().username
-            except:
-                pass
+        # Username бота, если он не задан, запрашивается у Telegram
+        # асинхронно в VoiceDenoiserBot.setup(), а не при импорте
 
 
 # Создаем экземпляр настроек
@@ -5,7 +5,12 @@
 import logging
 from pathlib import Path
 from typing import Optional
+from collections import OrderedDict
+import weakref
+from dataclasses import dataclass, field
+from types import MappingProxyType
 import asyncio
+import time
 
 from telegram import Update, Message
 from telegram.ext import (
@@ -27,11 +32,24 @@ from .config import settings
 
 logger = logging.getLogger(__name__)
 
-# Состояния пользователей
-USER_STATES = {}
 
+@dataclass(slots=True)
+class UserState:
+    """Состояние пользователя в диалоге с ботом."""
+    
+    waiting_for_audio: bool = False
+    processing: bool = False
+    current_file: Optional[str] = None
+    settings: dict = field(default_factory=dict)
+    last_access: float = 0.0  # time.monotonic() последнего обращения
+
+
+# Состояния пользователей в порядке последнего обращения (LRU): размер
+# ограничен MAX_USER_STATES, неактивные дольше USER_STATE_TTL удаляются
+USER_STATES: "OrderedDict[int, UserState]" = OrderedDict()
 
-def get_user_state(user_id: int) -> dict:
+
+def get_user_state(user_id: int) -> UserState:
     """
     Получает состояние пользователя.
     
@@ -41,14 +59,49 @@ def get_user_state(user_id: int) -> dict:
     Returns:
         Состояние пользователя
     """
-    if user_id not in USER_STATES:
-        USER_STATES[user_id] = {
-            "waiting_for_audio": False,
-            "processing": False,
-            "current_file": None,
-            "settings": utils.get_user_settings(user_id)
-        }
-    return USER_STATES[user_id]
+    now = time.monotonic()
+    state = USER_STATES.get(user_id)
+    
+    if state is None:
+        state = UserState(settings=utils.get_user_settings(user_id))
+        USER_STATES[user_id] = state
+    else:
+        USER_STATES.move_to_end(user_id)
+    state.last_access = now
+    
+    # Вытесняем самые давние состояния: сверх лимита или с истекшим TTL
+    while len(USER_STATES) > settings.MAX_USER_STATES:
+        USER_STATES.popitem(last=False)
+    while USER_STATES:
+        oldest = next(iter(USER_STATES.values()))
+        if now - oldest.last_access <= settings.USER_STATE_TTL:
+            break
+        USER_STATES.popitem(last=False)
+    
+    return state
+
+
+# Блокировки обработки аудио по чатам: обновления обрабатываются
+# конкурентно (concurrent_updates), но файлы одного чата - по очереди.
+# Неиспользуемые блокировки удаляются сборщиком мусора
+CHAT_LOCKS: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def get_chat_lock(chat_id: int) -> asyncio.Lock:
+    """
+    Возвращает блокировку обработки аудио для чата.
+    
+    Args:
+        chat_id: ID чата
+        
+    Returns:
+        Блокировка чата
+    """
+    lock = CHAT_LOCKS.get(chat_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        CHAT_LOCKS[chat_id] = lock
+    return lock
 
 
 def set_user_state(user_id: int, key: str, value):
@@ -61,7 +114,7 @@ def set_user_state(user_id: int, key: str, value):
         value: Значение
     """
     state = get_user_state(user_id)
-    state[key] = value
+    setattr(state, key, value)
 
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -95,7 +148,6 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def methods_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /methods."""
     try:
-        import asyncio
         # Показываем индикатор загрузки
         await utils.show_typing_indicator(update, context)
         
@@ -118,7 +170,7 @@ async def methods_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /settings."""
     user_id = update.effective_user.id
-    user_settings = get_user_state(user_id)["settings"]
+    user_settings = get_user_state(user_id).settings
     
     settings_text = (
         "⚙️ <b>Настройки очистки</b>\n\n"
@@ -151,7 +203,8 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         # Добавляем информацию о боте
         status_text += f"🤖 <b>Бот:</b> работает\n"
-        status_text += f"📁 <b>Временные файлы:</b> {len(list(settings.TEMP_DIR.iterdir()))}\n"
+        temp_count = utils.count_temp_files()
+        status_text += f"📁 <b>Временные файлы:</b> {temp_count}\n"
         
         if api_available:
             # Пробуем получить статистику
@@ -182,13 +235,11 @@ async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     
     # Сбрасываем состояние пользователя
-    if user_id in USER_STATES:
-        USER_STATES[user_id] = {
-            "waiting_for_audio": False,
-            "processing": False,
-            "current_file": None,
-            "settings": USER_STATES[user_id].get("settings", {})
-        }
+    state = USER_STATES.get(user_id)
+    if state is not None:
+        state.waiting_for_audio = False
+        state.processing = False
+        state.current_file = None
     
     await update.message.reply_text(
         "✅ Операция отменена.",
@@ -196,60 +247,77 @@ async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+async def _prompt_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Кнопка «Очистить голосовое»: ждем голосовое сообщение."""
+    await update.message.reply_text(
+        "🎤 Отправьте голосовое сообщение для очистки.\n"
+        "Или используйте /cancel для отмены.",
+        reply_markup=keyboards.get_cancel_keyboard()
+    )
+    set_user_state(update.effective_user.id, "waiting_for_audio", True)
+
+
+async def _prompt_audio_file(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Кнопка «Отправить аудиофайл»: ждем аудиофайл."""
+    await update.message.reply_text(
+        "📁 Отправьте аудиофайл (WAV, MP3, OGG, FLAC, M4A, AAC).\n"
+        "Максимальный размер: 50 MB.\n"
+        "Используйте /cancel для отмены.",
+        reply_markup=keyboards.get_cancel_keyboard()
+    )
+    set_user_state(update.effective_user.id, "waiting_for_audio", True)
+
+
+async def _unknown_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Ответ на текст, не совпадающий ни с одной кнопкой."""
+    await update.message.reply_text(
+        "Я не понимаю эту команду. Используйте /help для справки.",
+        reply_markup=keyboards.get_main_keyboard()
+    )
+
+
+# Обработчики кнопок основной клавиатуры по тексту кнопки
+TEXT_BUTTON_HANDLERS = MappingProxyType({
+    "🎤 Очистить голосовое": _prompt_voice,
+    "📁 Отправить аудиофайл": _prompt_audio_file,
+    "⚙️ Настройки": settings_command,
+    "📋 Методы": methods_command,
+    "❓ Помощь": help_command,
+    "📊 Статус": status_command,
+})
+
+
 async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик текстовых сообщений."""
-    text = update.message.text
-    user_id = update.effective_user.id
-    
-    if text == "🎤 Очистить голосовое":
-        await update.message.reply_text(
-            "🎤 Отправьте голосовое сообщение для очистки.\n"
-            "Или используйте /cancel для отмены.",
-            reply_markup=keyboards.get_cancel_keyboard()
-        )
-        set_user_state(user_id, "waiting_for_audio", True)
-        
-    elif text == "📁 Отправить аудиофайл":
-        await update.message.reply_text(
-            "📁 Отправьте аудиофайл (WAV, MP3, OGG, FLAC, M4A, AAC).\n"
-            "Максимальный размер: 50 MB.\n"
-            "Используйте /cancel для отмены.",
-            reply_markup=keyboards.get_cancel_keyboard()
-        )
-        set_user_state(user_id, "waiting_for_audio", True)
-        
-    elif text == "⚙️ Настройки":
-        await settings_command(update, context)
-        
-    elif text == "📋 Методы":
-        await methods_command(update, context)
-        
-    elif text == "❓ Помощь":
-        await help_command(update, context)
-        
-    elif text == "📊 Статус":
-        await status_command(update, context)
-        
-    else:
-        await update.message.reply_text(
-            "Я не понимаю эту команду. Используйте /help для справки.",
-            reply_markup=keyboards.get_main_keyboard()
-        )
+    handler = TEXT_BUTTON_HANDLERS.get(update.message.text, _unknown_text)
+    await handler(update, context)
 
 
 async def handle_audio_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик аудио сообщений."""
     user_id = update.effective_user.id
     user_state = get_user_state(user_id)
+    lock = get_chat_lock(update.effective_chat.id)
     
     # Проверяем, не обрабатывается ли уже файл
-    if user_state.get("processing"):
+    if user_state.processing or lock.locked():
         await update.message.reply_text(
             "⏳ Пожалуйста, дождитесь завершения текущей обработки.",
             reply_markup=keyboards.get_main_keyboard()
         )
         return
     
+    async with lock:
+        await _process_audio_message(update, context, user_id, user_state)
+
+
+async def _process_audio_message(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    user_id: int,
+    user_state: UserState
+):
+    """Скачивает, проверяет и обрабатывает аудио (под блокировкой чата)."""
     # Скачиваем файл
     await utils.show_uploading_indicator(update, context)
     
@@ -270,17 +338,17 @@ async def handle_audio_message(update: Update, context: ContextTypes.DEFAULT_TYP
             ext_error,
             reply_markup=keyboards.get_main_keyboard()
         )
-        file_path.unlink()
+        await asyncio.to_thread(utils.remove_temp_file, file_path)
         return
     
-    # Проверяем размер файла
-    is_valid_size, size_error = utils.validate_file_size(file_path)
+    # Проверяем размер файла (файловые операции - вне event loop)
+    is_valid_size, size_error = await asyncio.to_thread(utils.validate_file_size, file_path)
     if not is_valid_size:
         await update.message.reply_text(
             size_error,
             reply_markup=keyboards.get_main_keyboard()
         )
-        file_path.unlink()
+        await asyncio.to_thread(utils.remove_temp_file, file_path)
         return
     
     # Сохраняем информацию о файле
@@ -288,7 +356,7 @@ async def handle_audio_message(update: Update, context: ContextTypes.DEFAULT_TYP
     set_user_state(user_id, "processing", True)
     
     # Получаем настройки пользователя
-    user_settings = user_state["settings"]
+    user_settings = user_state.settings
     
     # Отправляем сообщение о начале обработки
     processing_msg = await update.message.reply_text(
@@ -343,8 +411,179 @@ async def handle_audio_message(update: Update, context: ContextTypes.DEFAULT_TYP
         set_user_state(user_id, "current_file", None)
         
         # Удаляем временный файл
-        if file_path.exists():
-            file_path.unlink()
+        await asyncio.to_thread(utils.remove_temp_file, file_path)
+
+
+async def _cb_method(update: Update, context: ContextTypes.DEFAULT_TYPE, method: str):
+    """Выбор метода очистки (method_<метод>)."""
+    query = update.callback_query
+    user_state = get_user_state(update.effective_user.id)
+    user_state.settings["method"] = method
+    
+    if method == "bandpass":
+        # Для bandpass метода нужно выбрать тип голоса
+        await query.edit_message_text(
+            "🎚️ Выбран метод: <b>Bandpass фильтрация</b>\n"
+            "Выберите тип голоса:",
+            reply_markup=keyboards.get_voice_type_keyboard(),
+            parse_mode=ParseMode.HTML
+        )
+    else:
+        # Для других методов просто уведомляем и оставляем старую клавиатуру
+        await query.edit_message_text(
+            f"✅ Выбран метод: <b>{method}</b>\n\n"
+            "Теперь отправьте аудиофайл для очистки.",
+            reply_markup=keyboards.get_methods_keyboard(),  # Оставляем ту же клавиатуру
+            parse_mode=ParseMode.HTML
+        )
+
+
+async def _cb_voice(update: Update, context: ContextTypes.DEFAULT_TYPE, voice_type: str):
+    """Выбор типа голоса (voice_<тип>)."""
+    query = update.callback_query
+    user_state = get_user_state(update.effective_user.id)
+    user_state.settings["voice_type"] = voice_type
+    
+    voice_names = {
+        "male": "👨 Мужской",
+        "female": "👩 Женский",
+        "broadband": "🔊 Широкополосный"
+    }
+    
+    # Убираем инлайн-клавиатуру и показываем сообщение
+    await query.edit_message_text(
+        f"✅ Настройки сохранены:\n"
+        f"• Метод: <b>bandpass</b>\n"
+        f"• Тип голоса: <b>{voice_names.get(voice_type, voice_type)}</b>\n\n"
+        "Теперь отправьте аудиофайл для очистки.",
+        reply_markup=None,  # Убираем инлайн-клавиатуру
+        parse_mode=ParseMode.HTML
+    )
+    
+    # Отправляем основную клавиатуру в новом сообщении
+    await context.bot.send_message(
+        chat_id=update.effective_chat.id,
+        text="Используйте кнопки ниже:",
+        reply_markup=keyboards.get_main_keyboard()
+    )
+
+
+async def _cb_rate(update: Update, context: ContextTypes.DEFAULT_TYPE, rate: str):
+    """Выбор частоты дискретизации (rate_<Гц>)."""
+    rate = int(rate)
+    user_state = get_user_state(update.effective_user.id)
+    user_state.settings["sample_rate"] = rate
+    
+    await update.callback_query.edit_message_text(
+        f"✅ Частота дискретизации установлена: <b>{rate} Гц</b>",
+        reply_markup=keyboards.get_settings_keyboard(),  # Возвращаем клавиатуру настроек
+        parse_mode=ParseMode.HTML
+    )
+
+
+async def _cb_format(update: Update, context: ContextTypes.DEFAULT_TYPE, fmt: str):
+    """Выбор формата (format_<формат>)."""
+    user_state = get_user_state(update.effective_user.id)
+    user_state.settings["format"] = fmt
+    
+    await update.callback_query.edit_message_text(
+        f"✅ Формат установлен: <b>{fmt.upper()}</b>",
+        reply_markup=keyboards.get_settings_keyboard(),
+        parse_mode=ParseMode.HTML
+    )
+
+
+async def _cb_save_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Сохранение настроек."""
+    user_id = update.effective_user.id
+    user_state = get_user_state(user_id)
+    utils.save_user_settings(user_id, user_state.settings)
+    
+    await update.callback_query.edit_message_text(
+        "✅ Настройки сохранены!",
+        reply_markup=None
+    )
+    
+    # Отправляем основную клавиатуру
+    await context.bot.send_message(
+        chat_id=update.effective_chat.id,
+        text="Используйте кнопки ниже:",
+        reply_markup=keyboards.get_main_keyboard()
+    )
+
+
+async def _cb_cancel_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Отмена настроек."""
+    await update.callback_query.edit_message_text(
+        "❌ Настройки не сохранены.",
+        reply_markup=None
+    )
+    
+    await context.bot.send_message(
+        chat_id=update.effective_chat.id,
+        text="Возвращаюсь в главное меню:",
+        reply_markup=keyboards.get_main_keyboard()
+    )
+
+
+async def _cb_admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Статистика для администратора."""
+    query = update.callback_query
+    if not utils.is_admin(update.effective_user.id):
+        await query.edit_message_text("⛔ Доступ запрещен.")
+        return
+    
+    from .api_client import api_client
+    async with api_client as client:
+        stats = await client.get_stats()
+    
+    stats_text = "📊 <b>Статистика API</b>\n\n"
+    if stats:
+        for key, value in stats.items():
+            stats_text += f"• {key}: <b>{value}</b>\n"
+    else:
+        stats_text += "❌ Не удалось получить статистику"
+    
+    await query.edit_message_text(
+        stats_text,
+        parse_mode=ParseMode.HTML,
+        reply_markup=None
+    )
+
+
+async def _cb_admin_cleanup(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Очистка кеша (только для администратора)."""
+    query = update.callback_query
+    if not utils.is_admin(update.effective_user.id):
+        await query.edit_message_text("⛔ Доступ запрещен.")
+        return
+    
+    await asyncio.to_thread(utils.cleanup_temp_files)
+    file_count = utils.count_temp_files()
+    
+    await query.edit_message_text(
+        f"✅ Кеш очищен. Файлов осталось: {file_count}",
+        reply_markup=None
+    )
+
+
+# Инлайн-кнопки с точным значением callback_data
+CALLBACK_EXACT_HANDLERS = MappingProxyType({
+    "save_settings": _cb_save_settings,
+    "cancel_settings": _cb_cancel_settings,
+    "back_to_methods": methods_command,  # Возврат к выбору метода
+    "cancel": cancel_command,  # Отмена операции
+    "admin_stats": _cb_admin_stats,
+    "admin_cleanup": _cb_admin_cleanup,
+})
+
+# Инлайн-кнопки вида <префикс>_<значение>: значение передается обработчику
+CALLBACK_PREFIX_HANDLERS = MappingProxyType({
+    "method": _cb_method,
+    "voice": _cb_voice,
+    "rate": _cb_rate,
+    "format": _cb_format,
+})
 
 
 async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -352,161 +591,18 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
     query = update.callback_query
     await query.answer()
     
-    user_id = update.effective_user.id
     data = query.data
     
     try:
-        print(data)
-        if data.startswith("method_"):
-            # Выбор метода очистки
-            method = data.replace('method_', '')
-            user_state = get_user_state(user_id)
-            user_state["settings"]["method"] = method
-            
-            if method == "bandpass":
-                # Для bandpass метода нужно выбрать тип голоса
-                await query.edit_message_text(
-                    "🎚️ Выбран метод: <b>Bandpass фильтрация</b>\n"
-                    "Выберите тип голоса:",
-                    reply_markup=keyboards.get_voice_type_keyboard(),
-                    parse_mode=ParseMode.HTML
-                )
-            else:
-                # Для других методов просто уведомляем и оставляем старую клавиатуру
-                await query.edit_message_text(
-                    f"✅ Выбран метод: <b>{method}</b>\n\n"
-                    "Теперь отправьте аудиофайл для очистки.",
-                    reply_markup=keyboards.get_methods_keyboard(),  # Оставляем ту же клавиатуру
-                    parse_mode=ParseMode.HTML
-                )
+        handler = CALLBACK_EXACT_HANDLERS.get(data)
+        if handler is not None:
+            await handler(update, context)
+            return
         
-        elif data.startswith("voice_"):
-            # Выбор типа голоса
-            voice_type = data.split("_")[1]
-            user_state = get_user_state(user_id)
-            user_state["settings"]["voice_type"] = voice_type
-            
-            voice_names = {
-                "male": "👨 Мужской",
-                "female": "👩 Женский",
-                "broadband": "🔊 Широкополосный"
-            }
-            
-            # Убираем инлайн-клавиатуру и показываем сообщение
-            await query.edit_message_text(
-                f"✅ Настройки сохранены:\n"
-                f"• Метод: <b>bandpass</b>\n"
-                f"• Тип голоса: <b>{voice_names.get(voice_type, voice_type)}</b>\n\n"
-                "Теперь отправьте аудиофайл для очистки.",
-                reply_markup=None,  # Убираем инлайн-клавиатуру
-                parse_mode=ParseMode.HTML
-            )
-            
-            # Отправляем основную клавиатуру в новом сообщении
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text="Используйте кнопки ниже:",
-                reply_markup=keyboards.get_main_keyboard()
-            )
-        
-        elif data.startswith("rate_"):
-            # Выбор частоты дискретизации
-            rate = int(data.split("_")[1])
-            user_state = get_user_state(user_id)
-            user_state["settings"]["sample_rate"] = rate
-            
-            await query.edit_message_text(
-                f"✅ Частота дискретизации установлена: <b>{rate} Гц</b>",
-                reply_markup=keyboards.get_settings_keyboard(),  # Возвращаем клавиатуру настроек
-                parse_mode=ParseMode.HTML
-            )
-        
-        elif data.startswith("format_"):
-            # Выбор формата
-            fmt = data.split("_")[1]
-            user_state = get_user_state(user_id)
-            user_state["settings"]["format"] = fmt
-            
-            await query.edit_message_text(
-                f"✅ Формат установлен: <b>{fmt.upper()}</b>",
-                reply_markup=keyboards.get_settings_keyboard(),
-                parse_mode=ParseMode.HTML
-            )
-        
-        elif data == "save_settings":
-            # Сохранение настроек
-            user_state = get_user_state(user_id)
-            utils.save_user_settings(user_id, user_state["settings"])
-            
-            await query.edit_message_text(
-                "✅ Настройки сохранены!",
-                reply_markup=None
-            )
-            
-            # Отправляем основную клавиатуру
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text="Используйте кнопки ниже:",
-                reply_markup=keyboards.get_main_keyboard()
-            )
-        
-        elif data == "cancel_settings":
-            # Отмена настроек
-            await query.edit_message_text(
-                "❌ Настройки не сохранены.",
-                reply_markup=None
-            )
-            
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text="Возвращаюсь в главное меню:",
-                reply_markup=keyboards.get_main_keyboard()
-            )
-        
-        elif data == "back_to_methods":
-            # Возврат к выбору метода
-            await methods_command(update, context)
-        
-        elif data == "cancel":
-            # Отмена операции
-            await cancel_command(update, context)
-        
-        elif data == "admin_stats":
-            # Статистика для администратора
-            if not utils.is_admin(user_id):
-                await query.edit_message_text("⛔ Доступ запрещен.")
-                return
-            
-            from .api_client import api_client
-            async with api_client as client:
-                stats = await client.get_stats()
-            
-            stats_text = "📊 <b>Статистика API</b>\n\n"
-            if stats:
-                for key, value in stats.items():
-                    stats_text += f"• {key}: <b>{value}</b>\n"
-            else:
-                stats_text += "❌ Не удалось получить статистику"
-            
-            await query.edit_message_text(
-                stats_text,
-                parse_mode=ParseMode.HTML,
-                reply_markup=None
-            )
-        
-        elif data == "admin_cleanup":
-            # Очистка кеша
-            if not utils.is_admin(user_id):
-                await query.edit_message_text("⛔ Доступ запрещен.")
-                return
-            
-            utils.cleanup_temp_files()
-            file_count = len(list(settings.TEMP_DIR.iterdir()))
-            
-            await query.edit_message_text(
-                f"✅ Кеш очищен. Файлов осталось: {file_count}",
-                reply_markup=None
-            )
+        prefix, _, value = data.partition("_")
+        handler = CALLBACK_PREFIX_HANDLERS.get(prefix)
+        if handler is not None:
+            await handler(update, context, value)
     
     except Exception as e:
         logger.error(f"Error in callback query handler: {e}")
@@ -536,6 +632,11 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             pass  # Не удалось отправить сообщение
 
 
+# Фильтры сообщений собираются один раз при импорте модуля
+TEXT_FILTERS = filters.TEXT & ~filters.COMMAND
+AUDIO_FILTERS = filters.VOICE | filters.AUDIO | filters.Document.MimeType("audio/*")
+
+
 def setup_handlers(application):
     """
     Настраивает обработчики для приложения.
@@ -543,43 +644,43 @@ def setup_handlers(application):
     Args:
         application: Экземпляр Application
     """
-    # Команды
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("methods", methods_command))
-    application.add_handler(CommandHandler("settings", settings_command))
-    application.add_handler(CommandHandler("status", status_command))
-    application.add_handler(CommandHandler("cancel", cancel_command))
-    
-    # Обработчик текстовых сообщений
-    application.add_handler(MessageHandler(
-        filters.TEXT & ~filters.COMMAND,
-        handle_text_message
-    ))
-    
-    # Обработчик аудио сообщений
-    audio_filters = filters.VOICE | filters.AUDIO | (
-        filters.Document.MimeType("audio/*")
-    )
-    application.add_handler(MessageHandler(
-        audio_filters,
-        handle_audio_message
-    ))
-    
-    # Обработчик инлайн-кнопок
-    application.add_handler(CallbackQueryHandler(handle_callback_query))
+    application.add_handlers({0: [
+        # Команды
+        CommandHandler("start", start_command),
+        CommandHandler("help", help_command),
+        CommandHandler("methods", methods_command),
+        CommandHandler("settings", settings_command),
+        CommandHandler("status", status_command),
+        CommandHandler("cancel", cancel_command),
+        # Обработчик текстовых сообщений
+        MessageHandler(TEXT_FILTERS, handle_text_message),
+        # Обработчик аудио сообщений
+        MessageHandler(AUDIO_FILTERS, handle_audio_message),
+        # Обработчик инлайн-кнопок
+        CallbackQueryHandler(handle_callback_query),
+    ]})
     
     # Обработчик ошибок
     application.add_error_handler(error_handler)
     
-    # Запускаем периодическую очистку временных файлов
-    asyncio.create_task(periodic_cleanup())
+    # Периодическая очистка временных файлов через JobQueue: задача
+    # останавливается вместе с приложением при shutdown
+    if application.job_queue is not None:
+        application.job_queue.run_repeating(
+            periodic_cleanup,
+            interval=CLEANUP_INTERVAL,
+            first=CLEANUP_INTERVAL,
+            name="periodic_cleanup"
+        )
+    else:
+        logger.warning("JobQueue недоступен (нужен python-telegram-bot[job-queue]), "
+                       "периодическая очистка отключена")
 
 
-async def periodic_cleanup():
-    """Периодическая очистка временных файлов."""
-    import asyncio
-    
-    while True:
-        await asyncio.sleep(3600)  # Каждый час
-        utils.cleanup_temp_files()
\ No newline at end of file
+CLEANUP_INTERVAL = 3600  # Интервал периодической очистки, сек (каждый час)
+
+
+async def periodic_cleanup(context: ContextTypes.DEFAULT_TYPE):
+    """Периодическая очистка временных файлов (задача JobQueue)."""
+    await asyncio.to_thread(utils.cleanup_temp_files)
+    utils.prune_chat_actions()
\ No newline at end of file
@@ -1,5 +1,8 @@
 """
 Клавиатуры для Telegram бота.
+
+Клавиатуры не зависят от пользователя, а объекты PTB неизменяемы,
+поэтому каждая строится один раз на процесс (lru_cache).
 """
 
 from telegram import (
@@ -9,8 +12,10 @@ from telegram import (
     KeyboardButton
 )
 from typing import List, Tuple
+from functools import lru_cache
 
 
+@lru_cache(maxsize=1)
 def get_main_keyboard() -> ReplyKeyboardMarkup:
     """
     Создает основную клавиатуру.
@@ -28,6 +33,7 @@ def get_main_keyboard() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
 
 
+@lru_cache(maxsize=1)
 def get_methods_keyboard() -> InlineKeyboardMarkup:
     """
     Создает инлайн-клавиатуру для выбора метода очистки.
@@ -56,6 +62,7 @@ def get_methods_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(buttons)
 
 
+@lru_cache(maxsize=1)
 def get_voice_type_keyboard() -> InlineKeyboardMarkup:
     """
     Создает инлайн-клавиатуру для выбора типа голоса.
@@ -77,6 +84,7 @@ def get_voice_type_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(buttons)
 
 
+@lru_cache(maxsize=1)
 def get_settings_keyboard() -> InlineKeyboardMarkup:
     """
     Создает инлайн-клавиатуру для настроек.
@@ -106,6 +114,7 @@ def get_settings_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(buttons)
 
 
+@lru_cache(maxsize=1)
 def get_cancel_keyboard() -> InlineKeyboardMarkup:
     """
     Создает инлайн-клавиатуру с кнопкой отмены.
@@ -117,6 +126,7 @@ def get_cancel_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(buttons)
 
 
+@lru_cache(maxsize=1)
 def get_confirmation_keyboard() -> InlineKeyboardMarkup:
     """
     Создает инлайн-клавиатуру для подтверждения.
@@ -134,6 +144,7 @@ def get_confirmation_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(buttons)
 
 
+@lru_cache(maxsize=1)
 def get_admin_keyboard() -> InlineKeyboardMarkup:
     """
     Создает инлайн-клавиатуру для администратора.
@@ -6,15 +6,16 @@ import os
 import hashlib
 import tempfile
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 import logging
-from datetime import datetime
 import asyncio
+import time
 
 from telegram import Update, Message
 from telegram.ext import ContextTypes
 
 from .config import settings
+from .api_client import api_client
 
 logger = logging.getLogger(__name__)
 
@@ -63,12 +64,14 @@ def validate_file_extension(filename: str) -> Tuple[bool, Optional[str]]:
     Returns:
         tuple[валиден_ли, сообщение_об_ошибке]
     """
-    ext = Path(filename).suffix.lower()
+    # Расширение без построения Path: все после последней точки
+    dot = filename.rfind(".")
+    ext = filename[dot:].lower() if dot >= 0 else ""
     
     if ext not in settings.SUPPORTED_FORMATS:
         return False, (
             f"❌ Неподдерживаемый формат файла: {ext}\n"
-            f"Поддерживаемые форматы: {', '.join(settings.SUPPORTED_FORMATS)}"
+            f"Поддерживаемые форматы: {', '.join(sorted(settings.SUPPORTED_FORMATS))}"
         )
     
     return True, None
@@ -85,44 +88,138 @@ def generate_temp_filename(original_filename: str, user_id: int) -> str:
     Returns:
         Уникальное имя файла
     """
-    timestamp = int(datetime.now().timestamp())
+    timestamp = time.time_ns()
     hash_input = f"{user_id}_{original_filename}_{timestamp}"
-    file_hash = hashlib.md5(hash_input.encode()).hexdigest()[:8]
+    # Хеш не криптографический, нужен только короткий идентификатор
+    file_hash = hashlib.blake2b(hash_input.encode(), digest_size=4).hexdigest()
     
     ext = Path(original_filename).suffix
     return f"{user_id}_{file_hash}{ext}"
 
 
+# Счетчик временных файлов: меняется при скачивании и удалении,
+# None - значение неизвестно и нужен обход директории
+_temp_count: Optional[int] = None
+
+
+def count_temp_files() -> int:
+    """
+    Возвращает количество временных файлов.
+    
+    Обычно читает счетчик без обращения к диску; директория
+    сканируется только если счетчик еще не заполнен или разошелся.
+    
+    Returns:
+        Количество файлов во временной директории
+    """
+    global _temp_count
+    if _temp_count is None or _temp_count < 0:
+        with os.scandir(settings.TEMP_DIR) as it:
+            _temp_count = sum(1 for entry in it if entry.is_file())
+    return _temp_count
+
+
+def _track_temp_file(delta: int):
+    """Корректирует счетчик временных файлов, если он уже заполнен."""
+    global _temp_count
+    if _temp_count is not None:
+        _temp_count += delta
+
+
+def remove_temp_file(file_path: Path):
+    """
+    Удаляет временный файл и уменьшает счетчик.
+    
+    Args:
+        file_path: Путь к файлу (отсутствующий файл не ошибка)
+    """
+    try:
+        file_path.unlink()
+    except FileNotFoundError:
+        return
+    _track_temp_file(-1)
+
+
+def _bulk_unlink(names: List[str]) -> int:
+    """
+    Удаляет файлы из TEMP_DIR по именам.
+    
+    Директория открывается один раз, удаление идет через unlinkat
+    относительно ее дескриптора - без разбора полного пути для
+    каждого файла.
+    
+    Args:
+        names: Имена файлов внутри TEMP_DIR
+        
+    Returns:
+        Количество удаленных файлов
+    """
+    if not names:
+        return 0
+    
+    removed = 0
+    if os.unlink in os.supports_dir_fd:
+        dir_fd = os.open(settings.TEMP_DIR, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+        try:
+            for name in names:
+                try:
+                    os.unlink(name, dir_fd=dir_fd)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        finally:
+            os.close(dir_fd)
+    else:
+        # Платформы без dir_fd (Windows)
+        for name in names:
+            try:
+                os.unlink(settings.TEMP_DIR / name)
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
 def cleanup_temp_files():
     """
     Очищает старые временные файлы.
     """
+    global _temp_count
     try:
-        current_time = datetime.now().timestamp()
+        # Один проход по директории: DirEntry кеширует stat,
+        # повторных обходов и stat-вызовов нет
+        with os.scandir(settings.TEMP_DIR) as it:
+            entries = [(entry, entry.stat().st_mtime) for entry in it if entry.is_file()]
         
-        for file_path in settings.TEMP_DIR.iterdir():
-            if file_path.is_file():
-                file_age = current_time - file_path.stat().st_mtime
-                
-                if file_age > settings.TEMP_FILE_LIFETIME:
-                    file_path.unlink()
-                    logger.info(f"Cleaned up temp file: {file_path.name}")
+        current_time = time.time()
+        fresh = []
+        expired = []
+        
+        for entry, mtime in entries:
+            if current_time - mtime > settings.TEMP_FILE_LIFETIME:
+                expired.append(entry.name)
+            else:
+                fresh.append((entry, mtime))
         
-        # Считаем количество файлов
-        file_count = len(list(settings.TEMP_DIR.iterdir()))
+        removed = _bulk_unlink(expired)
+        if removed:
+            logger.info(f"Cleaned up {removed} expired temp files")
+        
+        file_count = len(fresh)
         
         if file_count > settings.MAX_TEMP_FILES:
             # Удаляем самые старые файлы
-            files = sorted(
-                settings.TEMP_DIR.iterdir(),
-                key=lambda x: x.stat().st_mtime
-            )
-            
-            for file_path in files[:file_count - settings.MAX_TEMP_FILES]:
-                file_path.unlink()
-                logger.info(f"Removed old file (max limit): {file_path.name}")
+            fresh.sort(key=lambda item: item[1])
+            oldest = [entry.name for entry, _ in fresh[:file_count - settings.MAX_TEMP_FILES]]
+            removed = _bulk_unlink(oldest)
+            logger.info(f"Removed {removed} old files (max limit)")
+            file_count -= removed
+        
+        # Синхронизируем счетчик с фактическим состоянием директории
+        _temp_count = file_count
                 
     except Exception as e:
+        _temp_count = None
         logger.error(f"Error cleaning up temp files: {e}")
 
 
@@ -262,15 +359,21 @@ async def download_file_from_message(
     try:
         # Скачиваем файл
         file = await file_obj.get_file()
-        await file.download_to_drive(temp_path)
+        if file.file_path and file.file_path.startswith(("http://", "https://")):
+            # Потоково, блоками в файл: download_to_drive держит весь файл
+            # в памяти и пишет его на диск прямо в event loop
+            await api_client.download_to_file(file.file_path, temp_path)
+        else:
+            # Локальный Bot API сервер отдает путь к файлу на диске
+            await file.download_to_drive(temp_path)
+        _track_temp_file(1)
         
         return temp_path, filename
         
     except Exception as e:
         logger.error(f"Error downloading file: {e}")
         # Удаляем временный файл в случае ошибки
-        if temp_path.exists():
-            temp_path.unlink()
+        await asyncio.to_thread(temp_path.unlink, missing_ok=True)
         return None
 
 
@@ -308,26 +411,60 @@ def save_user_settings(user_id: int, settings: dict):
     logger.info(f"Settings saved for user {user_id}: {settings}")
 
 
-async def show_typing_indicator(
+# Время последней отправки действия по (чат, действие): Telegram показывает
+# действие около 5 секунд, повторная отправка раньше ничего не меняет
+_CHAT_ACTION_SENT = {}
+CHAT_ACTION_TTL = 4.0
+
+
+async def send_chat_action_once(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
-    interval: float = 5.0
+    action: str
 ):
     """
-    Показывает индикатор набора текста.
+    Отправляет действие в чат, если оно не отправлялось последние CHAT_ACTION_TTL секунд.
     
     Args:
         update: Объект Update
         context: Контекст
-        interval: Интервал в секундах
+        action: Действие (typing, upload_audio, ...)
     """
-    await context.bot.send_chat_action(
-        chat_id=update.effective_chat.id,
-        action="typing"
-    )
+    key = (update.effective_chat.id, action)
+    now = time.monotonic()
+    
+    if now - _CHAT_ACTION_SENT.get(key, -CHAT_ACTION_TTL) < CHAT_ACTION_TTL:
+        return
     
-    # Ждем указанный интервал
-    await asyncio.sleep(min(interval, 5.0))
+    _CHAT_ACTION_SENT[key] = now
+    await context.bot.send_chat_action(chat_id=key[0], action=action)
+
+
+def prune_chat_actions(max_age: float = 10.0):
+    """
+    Удаляет устаревшие записи об отправленных действиях.
+    
+    Args:
+        max_age: Возраст записи в секундах, после которого она удаляется
+    """
+    now = time.monotonic()
+    for key, sent_at in list(_CHAT_ACTION_SENT.items()):
+        if now - sent_at > max_age:
+            del _CHAT_ACTION_SENT[key]
+
+
+async def show_typing_indicator(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE
+):
+    """
+    Показывает индикатор набора текста.
+    
+    Args:
+        update: Объект Update
+        context: Контекст
+    """
+    await send_chat_action_once(update, context, "typing")
 
 
 async def show_uploading_indicator(
@@ -341,10 +478,7 @@ async def show_uploading_indicator(
         update: Объект Update
         context: Контекст
     """
-    await context.bot.send_chat_action(
-        chat_id=update.effective_chat.id,
-        action="upload_audio"
-    )
+    await send_chat_action_once(update, context, "upload_audio")
 
 
 async def show_processing_indicator(
@@ -358,10 +492,7 @@ async def show_processing_indicator(
         update: Объект Update
         context: Контекст
     """
-    await context.bot.send_chat_action(
-        chat_id=update.effective_chat.id,
-        action="upload_audio"  # Используем тот же индикатор
-    )
+    await send_chat_action_once(update, context, "upload_audio")  # Используем тот же индикатор
 
 
 def is_admin(user_id: int) -> bool:
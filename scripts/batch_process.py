@@ -5,11 +5,14 @@
 """
 
 import argparse
+import os
 import sys
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+import multiprocessing
 import time
-import json
+import orjson
 from datetime import datetime
 
 # Добавляем путь к проекту
@@ -49,7 +52,7 @@ def parse_arguments():
     parser.add_argument('--workers', '-w',
                        type=int,
                        default=2,
-                       help='Количество потоков для обработки (по умолчанию: 2)')
+                       help='Количество процессов для обработки (по умолчанию: 2)')
     
     parser.add_argument('--dry-run',
                        action='store_true',
@@ -78,23 +81,26 @@ def find_audio_files(input_dir: Path, extensions: list, recursive: bool) -> list
     Returns:
         Список путей к файлам
     """
+    ext_set = {ext.lower() for ext in extensions}
     audio_files = []
     
     if recursive:
-        # Рекурсивный поиск
-        for ext in extensions:
-            pattern = f"**/*{ext}"
-            files = list(input_dir.glob(pattern))
-            audio_files.extend(files)
+        # Один проход по дереву вместо отдельного glob на каждое расширение
+        walker = os.walk(input_dir)
     else:
         # Поиск только в текущей директории
-        for ext in extensions:
-            pattern = f"*{ext}"
-            files = list(input_dir.glob(pattern))
-            audio_files.extend(files)
+        with os.scandir(input_dir) as it:
+            names = [entry.name for entry in it if entry.is_file()]
+        walker = [(str(input_dir), [], names)]
     
-    # Убираем дубликаты и сортируем
-    audio_files = sorted(set(audio_files))
+    for root, _, names in walker:
+        for name in names:
+            dot = name.rfind('.')
+            if dot >= 0 and name[dot:].lower() in ext_set:
+                audio_files.append(Path(root) / name)
+    
+    # Каждый файл встречается один раз, достаточно сортировки
+    audio_files.sort()
     
     return audio_files
 
@@ -153,21 +159,29 @@ def process_single_file(input_file: Path, output_dir: Path, method: str, verbose
         }
 
 
-def create_report(results: list, output_dir: Path, method: str):
+def create_report(stats: dict, failures: list, input_dir: Path, output_dir: Path,
+                  method: str, files_report: Path, timestamp: str):
     """
     Создает отчет о пакетной обработке.
     
+    Результаты по отдельным файлам уже записаны построчно в files_report
+    (NDJSON) во время обработки, здесь сохраняется только сводка.
+    
     Args:
-        results: Результаты обработки
+        stats: Накопленная статистика (total_files, successful, total_processing_time)
+        failures: Результаты неудачно обработанных файлов
+        input_dir: Входная директория
         output_dir: Директория для отчета
         method: Использованный метод
+        files_report: NDJSON-файл с результатами по каждому файлу
+        timestamp: Метка времени для имен файлов отчета
     """
     # Статистика
-    total_files = len(results)
-    successful = sum(1 for r in results if r['success'])
+    total_files = stats['total_files']
+    successful = stats['successful']
     failed = total_files - successful
     
-    total_time = sum(r['processing_time'] for r in results if r['success'])
+    total_time = stats['total_processing_time']
     avg_time = total_time / successful if successful > 0 else 0
     
     # Создаем отчет
@@ -175,7 +189,7 @@ def create_report(results: list, output_dir: Path, method: str):
         'batch_processing_report': {
             'timestamp': datetime.now().isoformat(),
             'method': method,
-            'input_dir': str(results[0]['input_file'].parent) if results else '',
+            'input_dir': str(input_dir),
             'output_dir': str(output_dir),
             'statistics': {
                 'total_files': total_files,
@@ -186,16 +200,15 @@ def create_report(results: list, output_dir: Path, method: str):
                 'average_processing_time': avg_time,
                 'processing_speed': f"{total_time/max(total_files, 1):.3f} сек/файл"
             },
-            'files': results
+            'files_report': str(files_report)
         }
     }
     
     # Сохраняем JSON
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     report_file = output_dir / f"batch_report_{timestamp}.json"
     
-    with open(report_file, 'w', encoding='utf-8') as f:
-        json.dump(report, f, indent=2, ensure_ascii=False)
+    with open(report_file, 'wb') as f:
+        f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
     
     # Создаем текстовую сводку
     summary_file = output_dir / f"summary_{timestamp}.txt"
@@ -206,7 +219,7 @@ def create_report(results: list, output_dir: Path, method: str):
         
         f.write(f"Дата обработки:  {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
         f.write(f"Метод очистки:   {method}\n")
-        f.write(f"Входная директория:  {report['batch_processing_report']['input_dir']}\n")
+        f.write(f"Входная директория:  {input_dir}\n")
         f.write(f"Выходная директория: {output_dir}\n\n")
         
         f.write("СТАТИСТИКА:\n")
@@ -221,11 +234,11 @@ def create_report(results: list, output_dir: Path, method: str):
         if failed > 0:
             f.write("НЕУДАЧНЫЕ ФАЙЛЫ:\n")
             f.write("-" * 70 + "\n")
-            for result in results:
-                if not result['success']:
-                    f.write(f"• {Path(result['input_file']).name}: {result['error']}\n")
+            for result in failures:
+                f.write(f"• {Path(result['input_file']).name}: {result['error']}\n")
     
     print(f"\n📊 Отчет сохранен: {report_file}")
+    print(f"📄 Результаты по файлам: {files_report}")
     print(f"📋 Сводка сохранена: {summary_file}")
     
     return report
@@ -273,42 +286,64 @@ def main():
     # Обработка файлов
     print(f"\n🔄 Начинаю обработку {len(audio_files)} файлов...")
     print(f"   Метод: {args.method}")
-    print(f"   Потоков: {args.workers}")
+    print(f"   Процессов: {args.workers}")
     
     start_time = time.time()
-    results = []
     
-    # Многопоточная обработка
-    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+    # Результаты по файлам не копятся в памяти: при --report каждый
+    # сразу пишется строкой NDJSON, в памяти остаются счетчики и ошибки
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    files_report = output_dir / f"batch_files_{timestamp}.ndjson"
+    stats = {'total_files': 0, 'successful': 0, 'total_processing_time': 0.0}
+    failures = []
+    
+    # Обработка в отдельных процессах: DSP упирается в CPU и GIL,
+    # поэтому потоки почти не дают ускорения. spawn - чтобы дочерние
+    # процессы не наследовали состояние родителя (потоки BLAS и т.п.)
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=mp_context) as executor, \
+            (open(files_report, 'wb') if args.report else nullcontext()) as files_fp:
         # Создаем задачи
-        futures = []
-        for audio_file in audio_files:
-            future = executor.submit(
+        futures = {
+            executor.submit(
                 process_single_file,
                 audio_file,
                 output_dir,
                 args.method,
                 args.verbose
-            )
-            futures.append(future)
+            ): audio_file
+            for audio_file in audio_files
+        }
         
-        # Собираем результаты
-        for i, future in enumerate(futures, 1):
+        # Обрабатываем результаты по мере готовности
+        for done, future in enumerate(as_completed(futures), 1):
             try:
                 result = future.result()
-                results.append(result)
-                
-                # Прогресс
-                if not args.verbose:
-                    progress = i / len(futures) * 100
-                    print(f"  Прогресс: {progress:5.1f}% ({i}/{len(futures)})", end='\r')
             except Exception as e:
-                print(f"  ❌ Ошибка в потоке: {e}")
-                results.append({
-                    'input_file': str(audio_files[i-1]),
+                print(f"  ❌ Ошибка в процессе: {e}")
+                result = {
+                    'input_file': str(futures[future]),
+                    'output_file': None,
+                    'method': args.method,
+                    'processing_time': 0,
                     'success': False,
                     'error': str(e)
-                })
+                }
+            
+            stats['total_files'] += 1
+            if result['success']:
+                stats['successful'] += 1
+                stats['total_processing_time'] += result['processing_time']
+            else:
+                failures.append(result)
+            
+            if files_fp is not None:
+                files_fp.write(orjson.dumps(result) + b"\n")
+            
+            # Прогресс
+            if not args.verbose:
+                progress = done / len(futures) * 100
+                print(f"  Прогресс: {progress:5.1f}% ({done}/{len(futures)})", end='\r')
     
     if not args.verbose:
         print()  # Новая строка после прогресс-бара
@@ -316,26 +351,26 @@ def main():
     total_time = time.time() - start_time
     
     # Статистика
-    successful = sum(1 for r in results if r['success'])
-    failed = len(results) - successful
+    successful = stats['successful']
+    failed = len(failures)
     
     print(f"\n✅ Обработка завершена!")
     print(f"   Успешно: {successful} файлов")
     print(f"   Неудачно: {failed} файлов")
     print(f"   Общее время: {total_time:.2f} сек")
-    print(f"   Среднее время: {total_time/len(results):.2f} сек/файл")
+    print(f"   Среднее время: {total_time/stats['total_files']:.2f} сек/файл")
     
     # Создаем отчет
     if args.report:
         print(f"\n📊 Создание отчета...")
-        create_report(results, output_dir, args.method)
+        create_report(stats, failures, input_dir, output_dir, args.method,
+                      files_report, timestamp)
     
     # Показываем неудачные файлы
     if failed > 0:
         print(f"\n⚠  Неудачные файлы:")
-        for result in results:
-            if not result['success']:
-                print(f"  • {Path(result['input_file']).name}: {result['error']}")
+        for result in failures:
+            print(f"  • {Path(result['input_file']).name}: {result['error']}")
     
     print(f"\n🎉 Пакетная обработка завершена!")
     print(f"   Результаты сохранены в: {output_dir}")
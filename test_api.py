@@ -93,6 +93,32 @@ def test_denoise_single_file():
     assert download_response.status_code == 200
 
 
+def test_denoise_direct_response():
+    """Тест получения очищенного аудио прямо в ответе на /denoise."""
+    client = TestClient(app)
+    
+    sr = 16000
+    t = np.linspace(0, 1.0, sr)
+    test_audio = 0.5 * np.sin(2 * np.pi * 440 * t) + 0.1 * np.random.randn(len(t))
+    
+    with tempfile.NamedTemporaryFile(suffix=".wav") as tmp:
+        AudioIO.save_audio(test_audio, tmp.name, sr)
+        files = {"audio_file": ("test.wav", Path(tmp.name).read_bytes(), "audio/wav")}
+    
+    response = client.post(
+        "/api/denoise",
+        files=files,
+        data={"method": "bandpass"},
+        headers={"Accept": "application/octet-stream"}
+    )
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "audio/wav"
+    assert response.headers["x-method"] == "bandpass"
+    assert float(response.headers["x-processing-time"]) >= 0
+    assert response.content[:4] == b"RIFF"
+
+
 def test_denoise_with_parameters():
     """Тест очистки с различными параметрами."""
     client = TestClient(app)
@@ -125,6 +151,37 @@ def test_denoise_with_parameters():
         assert data["method"] == method
 
 
+def test_denoise_repeated_upload():
+    """Тест повторной загрузки того же файла (результат из кеша)."""
+    client = TestClient(app)
+    
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+        sr = 16000
+        duration = 0.5
+        t = np.linspace(0, duration, int(sr * duration))
+        test_audio = 0.3 * np.sin(2 * np.pi * 660 * t) + 0.05 * np.random.randn(len(t))
+        
+        AudioIO.save_audio(test_audio, tmp.name, sr)
+        tmp.seek(0)
+        files = {"audio_file": ("test_repeat.wav", tmp.read(), "audio/wav")}
+    
+    responses = [
+        client.post("/api/denoise", files=files, data={"method": "spectral_subtraction"})
+        for _ in range(2)
+    ]
+    
+    for response in responses:
+        assert response.status_code == 200
+    
+    first, second = (response.json() for response in responses)
+    assert first["request_id"] != second["request_id"]
+    assert first["filename"] == second["filename"]
+    assert first["original_info"] == second["original_info"]
+    
+    download_response = client.get(second["download_url"])
+    assert download_response.status_code == 200
+
+
 def test_invalid_file_format():
     """Тест с неподдерживаемым форматом файла."""
     client = TestClient(app)
@@ -210,6 +267,30 @@ def test_get_stats():
     assert "allowed_extensions" in data
 
 
+def test_orjson_responses():
+    """Тест сериализации JSON ответов через orjson."""
+    import asyncio
+    from app.api import errors
+    from app.api.routes import api_error_handler, generic_error_handler
+    
+    # Ответы маршрутов без response_model (/methods, /stats)
+    assert app.router.default_response_class is errors.ORJSONResponse
+    
+    # Ответы обработчиков ошибок
+    error = errors.UnsupportedFormatError("test.txt", [".wav"])
+    response = asyncio.run(api_error_handler(None, error))
+    assert isinstance(response, errors.ORJSONResponse)
+    assert response.status_code == 400
+    
+    response = asyncio.run(generic_error_handler(None, RuntimeError("boom")))
+    assert isinstance(response, errors.ORJSONResponse)
+    assert response.status_code == 500
+    
+    # Значения numpy сериализуются без преобразования
+    response = errors.ORJSONResponse({"value": np.float32(0.5)})
+    assert response.body == b'{"value":0.5}'
+
+
 def test_root_endpoint():
     """Тест корневого эндпоинта."""
     client = TestClient(app)
@@ -234,11 +315,14 @@ def main():
         ("Проверка здоровья", test_health_check),
         ("Получение методов", test_get_methods),
         ("Очистка одного файла", test_denoise_single_file),
+        ("Аудио в ответе на запрос", test_denoise_direct_response),
         ("Очистка с параметрами", test_denoise_with_parameters),
+        ("Повторная загрузка", test_denoise_repeated_upload),
         ("Неподдерживаемый формат", test_invalid_file_format),
         ("Слишком большой файл", test_file_too_large),
         ("Пакетная обработка", test_batch_denoise),
         ("Статистика", test_get_stats),
+        ("Сериализация orjson", test_orjson_responses),
         ("Корневой эндпоинт", test_root_endpoint),
     ]
     
@@ -12,6 +12,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 from app.core import AudioIO, Denoiser, create_denoiser
 import numpy as np
 import tempfile
+import warnings
 
 def test_audio_io():
     """Тест модуля AudioIO."""
@@ -83,6 +84,61 @@ def test_denoiser():
             print(f"    ✗ Ошибка: {e}")
             return False
     
+    # Рабочие буферы сверх предела не остаются закрепленными после вызова
+    large = Denoiser(verbose=False)
+    large.SCRATCH_MAX_ELEMENTS = 1024
+    large.denoise(noisy, sr=sr, method=Denoiser.METHOD_WIENER)
+    assert getattr(large._scratch, 'magnitude', None) is None
+    assert getattr(large._scratch, 'denominator', None) is None
+    print("  ✓ Большие рабочие буферы не кешируются")
+    
+    return True
+
+def test_denoise_batch():
+    """Тест пакетной обработки Denoiser."""
+    print("\nТестирование Denoiser.denoise_batch...")
+    
+    sr = 16000
+    denoiser = Denoiser(target_sr=sr, verbose=False)
+    
+    # Сигналы разной длины
+    batch = []
+    for duration in (1.0, 1.5, 0.7):
+        t = np.linspace(0, duration, int(sr * duration))
+        batch.append(0.3 * np.sin(2 * np.pi * 440 * t) + 0.1 * np.random.randn(len(t)))
+    
+    for method in (Denoiser.METHOD_SPECTRAL_SUBTRACTION, Denoiser.METHOD_WIENER, Denoiser.METHOD_BANDPASS):
+        results = denoiser.denoise_batch(batch, sr=sr, method=method)
+        
+        assert len(results) == len(batch)
+        for audio, result in zip(batch, results):
+            assert result['method'] == method
+            assert result['original_shape'] == audio.shape
+            assert len(result['audio']) <= len(audio)
+        
+        print(f"  ✓ Метод {method}: обработано {len(results)} сигналов")
+    
+    # Нулевые бины (тишина, дополнение коротких сигналов нулями)
+    # не дают предупреждений о переполнении при делении на амплитуду
+    silent = np.concatenate([np.zeros(sr // 2), batch[1]])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        for method in Denoiser.BATCHED_METHODS:
+            denoiser.denoise_batch([silent] + batch, sr=sr, method=method)
+    print("  ✓ Нулевые бины обрабатываются без предупреждений")
+    
+    # Результат пакета совпадает с поштучной обработкой, включая хвост
+    # коротких сигналов и сигналы короче сегмента оценки шума
+    batch.append(batch[0][:int(sr * 0.3)])
+    for method in Denoiser.BATCHED_METHODS:
+        results = denoiser.denoise_batch(batch, sr=sr, method=method)
+        for audio, result in zip(batch, results):
+            single = denoiser.denoise(audio, sr=sr, method=method)['audio']
+            assert result['audio'].shape == single.shape
+            assert np.allclose(result['audio'], single, atol=1e-5)
+        
+        print(f"  ✓ Метод {method}: пакет совпадает с denoise()")
+    
     return True
 
 def test_integration():
@@ -139,6 +195,7 @@ def main():
     tests = [
         ("AudioIO", test_audio_io),
         ("Denoiser", test_denoiser),
+        ("Пакетная обработка", test_denoise_batch),
         ("Интеграция", test_integration)
     ]
     